@@ -0,0 +1,95 @@
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+
+from heredity import ENGINES, load_data
+
+# Files handed to each worker process at a time
+CHUNK = 16
+
+# Columns written in CSV mode, one row per person
+FIELDS = ["file", "person", "gene_2", "gene_1", "gene_0", "trait_true", "trait_false"]
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python batch.py directory_or_glob [json|csv] [engine]")
+    files = family_files(sys.argv[1])
+    style = sys.argv[2] if len(sys.argv) > 2 else "json"
+    engine = sys.argv[3] if len(sys.argv) > 3 else "elimination"
+    if style not in ["json", "csv"]:
+        sys.exit("Format must be json or csv")
+    if engine not in ENGINES:
+        sys.exit(f"Engine must be one of: {', '.join(ENGINES)}")
+
+    writer = None
+    if style == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=FIELDS)
+        writer.writeheader()
+
+    # Results are written in file order as soon as each one is ready
+    for filename, probabilities, error in batch(files, engine):
+        if error is not None:
+            print(f"{filename}: {error}", file=sys.stderr)
+            if style == "json":
+                print(json.dumps({"file": filename, "error": error}), flush=True)
+        elif style == "json":
+            print(json.dumps({"file": filename, "people": probabilities}), flush=True)
+        else:
+            for person, row in probabilities.items():
+                writer.writerow({
+                    "file": filename,
+                    "person": person,
+                    "gene_2": row["gene"][2],
+                    "gene_1": row["gene"][1],
+                    "gene_0": row["gene"][0],
+                    "trait_true": row["trait"][True],
+                    "trait_false": row["trait"][False]
+                })
+            sys.stdout.flush()
+
+
+def family_files(pattern):
+    """
+    Return the sorted family CSV files in a directory, or matching a glob.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    files = sorted(glob.glob(pattern))
+    if not files:
+        sys.exit(f"No family files match {pattern}")
+    return files
+
+
+def solve_file(job):
+    """
+    Compute the probabilities for one family file with the given engine.
+    Returns (filename, probabilities, None) or (filename, None, error).
+    Each worker keeps its own cache of compiled pedigrees, so files with a
+    pedigree shape it has seen recently skip compilation.
+    """
+    filename, engine = job
+    try:
+        return filename, ENGINES[engine](load_data(filename)), None
+    except (OSError, KeyError, ValueError) as error:
+        return filename, None, f"{type(error).__name__}: {error}"
+
+
+def batch(files, engine="elimination", processes=None):
+    """
+    Yield (filename, probabilities, error) for each family file in order,
+    spreading the files over a pool of worker processes.
+    """
+    jobs = [(filename, engine) for filename in files]
+    if len(jobs) <= CHUNK:
+        yield from map(solve_file, jobs)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap(solve_file, jobs, chunksize=CHUNK)
+
+
+if __name__ == "__main__":
+    main()
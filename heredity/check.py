@@ -0,0 +1,108 @@
+import random
+import sys
+
+from heredity import ENGINES, numpy, pruned_probabilities
+
+# Families small enough for every engine to compare against `pruned`
+SMALL_FAMILIES = 20
+SMALL_SIZE = 7
+
+# A family large enough that unscaled products underflow
+LARGE_SIZE = 2000
+
+# Largest difference allowed between engines, or from a total of 1
+TOLERANCE = 1e-9
+
+
+def main():
+    if len(sys.argv) != 1:
+        sys.exit("Usage: python check.py")
+    rng = random.Random(0)
+    failures = 0
+
+    # Exact engines must agree with pruned enumeration on small families
+    engines = [name for name in ENGINES if name != "pruned"]
+    if numpy is None:
+        engines.remove("einsum")
+    for _ in range(SMALL_FAMILIES):
+        people = random_family(SMALL_SIZE, rng)
+        expected = pruned_probabilities(people)
+        for name in engines:
+            error = largest_difference(expected, ENGINES[name](people))
+            if error > TOLERANCE:
+                print(f"{name}: differs from pruned by {error:.2e}")
+                failures += 1
+
+    # Elimination must still give distributions on a large family
+    people = family_tree(LARGE_SIZE, rng)
+    probabilities = ENGINES["elimination"](people)
+    error = max(
+        abs(sum(distribution.values()) - 1)
+        for person in probabilities.values()
+        for distribution in person.values()
+    )
+    if error > TOLERANCE:
+        print(f"elimination: {LARGE_SIZE} people, sums off by {error:.2e}")
+        failures += 1
+
+    if failures:
+        sys.exit(f"{failures} checks failed")
+    print("All checks passed")
+
+
+def random_family(size, rng):
+    """
+    Return a family of `size` people in which anyone after the first two
+    may have two parents picked from earlier people, and about half the
+    traits are known.
+    """
+    people = {}
+    for i in range(size):
+        name = f"Person{i}"
+        mother = father = None
+        if i >= 2 and rng.random() < 0.7:
+            mother, father = rng.sample(list(people), 2)
+        people[name] = {
+            "name": name,
+            "mother": mother,
+            "father": father,
+            "trait": rng.choice([True, False, None, None])
+        }
+    return people
+
+
+def family_tree(size, rng):
+    """
+    Return a tree-shaped family of `size` people with every trait known:
+    each child has one parent from the family and one who married in.
+    """
+    people = {}
+    descendants = []
+    for i in range(size):
+        name = f"Person{i}"
+        mother = father = None
+        if i % 2 == 0 and descendants:
+            mother, father = rng.choice(descendants), f"Person{i - 1}"
+        people[name] = {
+            "name": name,
+            "mother": mother,
+            "father": father,
+            "trait": rng.random() < 0.3
+        }
+        if i % 2 == 0:
+            descendants.append(name)
+    return people
+
+
+def largest_difference(expected, probabilities):
+    """Return the largest difference between two sets of distributions."""
+    return max(
+        abs(expected[person][field][value] - probabilities[person][field][value])
+        for person in expected
+        for field in expected[person]
+        for value in expected[person][field]
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
 import csv
+import functools
+import heapq
 import itertools
+import math
+import multiprocessing
+import random
 import sys
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -37,24 +47,70 @@ PROBS = {
 }
 
 
+# Possible numbers of copies of the gene
+GENES = (0, 1, 2)
+
+# Samples per chain, sweeps discarded per Gibbs chain, and number of chains
+SAMPLES = 2000
+BURN_IN = 200
+CHAINS = 4
+
+# Compiled junction trees kept per process, by pedigree shape
+PEDIGREE_CACHE_SIZE = 256
+
+
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python heredity.py data.csv [engine]")
     people = load_data(sys.argv[1])
+    engine = sys.argv[2] if len(sys.argv) == 3 else "elimination"
+    if engine not in ENGINES and engine not in SAMPLERS:
+        sys.exit(f"Engine must be one of: {', '.join([*ENGINES, *SAMPLERS])}")
+
+    # Compute gene and trait probabilities for each person
+    if engine in SAMPLERS:
+        probabilities, diagnostics = sample_probabilities(people, engine)
+    else:
+        probabilities = ENGINES[engine](people)
 
-    # Keep track of gene and trait probabilities for each person
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+    # Sampling diagnostics
+    if engine == "gibbs":
+        worst = max(diagnostics["rhat"], key=diagnostics["rhat"].get)
+        print(f"Max R-hat: {diagnostics['rhat'][worst]:.4f} ({worst})")
+    elif engine == "weighting":
+        print(f"Effective sample size: {diagnostics['ess']:.0f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Compute every person's gene and trait distributions by enumerating
+    every combination of gene copies and traits consistent with the evidence.
+    Joint probabilities are accumulated in log space so that large families
+    do not underflow to zero.
+    """
+
+    # Keep track of the log of gene and trait probabilities for each person
     probabilities = {
         person: {
             "gene": {
-                2: 0,
-                1: 0,
-                0: 0
+                2: -math.inf,
+                1: -math.inf,
+                0: -math.inf
             },
             "trait": {
-                True: 0,
-                False: 0
+                True: -math.inf,
+                False: -math.inf
             }
         }
         for person in people
@@ -77,21 +133,13 @@ def main():
         for one_gene in powerset(names):
             for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
-
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+                # Update probabilities with new log joint probability
+                p = log_joint_probability(people, one_gene, two_genes, have_trait)
+                log_update(probabilities, one_gene, two_genes, have_trait, p)
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    # Leave log space with probabilities that sum to 1
+    log_normalize(probabilities)
+    return probabilities
 
 
 def load_data(filename):
@@ -118,14 +166,14 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Return a generator of all possible subsets of set s.
     """
     s = list(s)
-    return [
+    return (
         set(s) for s in itertools.chain.from_iterable(
             itertools.combinations(s, r) for r in range(len(s) + 1)
         )
-    ]
+    )
 
 
 def find_gene_copies(name, one_gene, two_genes):
@@ -172,6 +220,37 @@ def prob_child_gene(child_gene, mum_gene, dad_gene):
         return getting_from_parent[mum_gene]['yes'] * getting_from_parent[dad_gene]['yes']
 
 
+def log(p):
+    """
+    Return the natural log of a probability, or -inf for a probability of 0.
+    """
+    return math.log(p) if p > 0 else -math.inf
+
+
+# Logs of the probabilities used in a joint probability, looked up rather
+# than recomputed for every combination
+LOG_GENE = {g: log(PROBS["gene"][g]) for g in GENES}
+LOG_TRAIT = {
+    g: {value: log(PROBS["trait"][g][value]) for value in (True, False)}
+    for g in GENES
+}
+LOG_CHILD_GENE = {
+    (g, m, f): log(prob_child_gene(g, m, f))
+    for g, m, f in itertools.product(GENES, repeat=3)
+}
+
+
+def log_add(a, b):
+    """
+    Return log(exp(a) + exp(b)) without leaving log space.
+    """
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Compute and return a joint probability.
@@ -246,6 +325,60 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
         probabilities[person]['trait'][b] += p
 
 
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute and return the log of `joint_probability`, as a sum of logs
+    that cannot underflow however many people there are.
+    """
+    total = 0
+    for p in people:
+        gene = find_gene_copies(p, one_gene, two_genes)
+        if people[p]['mother'] and people[p]['father']:
+            mother = find_gene_copies(people[p]['mother'], one_gene, two_genes)
+            father = find_gene_copies(people[p]['father'], one_gene, two_genes)
+            total += LOG_CHILD_GENE[(gene, mother, father)]
+        else:
+            total += LOG_GENE[gene]
+        total += LOG_TRAIT[gene][find_trait(p, have_trait)]
+    return total
+
+
+def log_update(probabilities, one_gene, two_genes, have_trait, p):
+    """
+    Add a new joint probability to `probabilities` like `update`, where both
+    the distributions and `p` are logs, using log-sum-exp.
+    """
+    for person in probabilities:
+        num = find_gene_copies(person, one_gene, two_genes)
+        gene = probabilities[person]['gene']
+        gene[num] = log_add(gene[num], p)
+        b = find_trait(person, have_trait)
+        trait = probabilities[person]['trait']
+        trait[b] = log_add(trait[b], p)
+
+
+def log_normalize(probabilities):
+    """
+    Update `probabilities`, whose distributions hold logs, such that each
+    distribution holds probabilities summing to 1. Each distribution is
+    shifted by its largest log before leaving log space, so the largest
+    value becomes exactly 1 before normalizing and nothing underflows.
+    A distribution with no mass at all is left as zeros.
+    """
+    for person in probabilities:
+        for field in probabilities[person].values():
+            largest = max(field.values())
+            if largest == -math.inf:
+                for value in field:
+                    field[value] = 0
+                continue
+            for value in field:
+                field[value] = math.exp(field[value] - largest)
+            total = sum(field.values())
+            for value in field:
+                field[value] /= total
+
+
 def normalize(probabilities):
     """
     Update `probabilities` such that each probability distribution
@@ -271,5 +404,624 @@ def normalize(probabilities):
                 probabilities[person]['trait'][b] *= trait_factor
 
 
+
+def multiply(f, g):
+    """
+    Multiply two factors. A factor is a tuple of variables (person numbers)
+    and a table mapping each tuple of their gene copies to a value.
+    """
+    f_vars, f_table = f
+    g_vars, g_table = g
+    variables = f_vars + tuple(v for v in g_vars if v not in f_vars)
+    f_pos = [variables.index(v) for v in f_vars]
+    g_pos = [variables.index(v) for v in g_vars]
+    table = {}
+    for values in itertools.product(GENES, repeat=len(variables)):
+        table[values] = (f_table[tuple(values[k] for k in f_pos)] *
+                         g_table[tuple(values[k] for k in g_pos)])
+    return variables, table
+
+
+def sum_out(f, keep):
+    """
+    Sum a factor over every variable not in `keep`.
+    """
+    f_vars, f_table = f
+    variables = tuple(v for v in f_vars if v in keep)
+    pos = [f_vars.index(v) for v in variables]
+    table = dict.fromkeys(itertools.product(GENES, repeat=len(variables)), 0)
+    for values, p in f_table.items():
+        table[tuple(values[k] for k in pos)] += p
+    return variables, table
+
+
+def rescale(f):
+    """
+    Divide a factor by its largest value, so that repeated products of
+    factors cannot underflow. Only normalized marginals are read from
+    calibrated factors, so the scale itself is not needed.
+    """
+    f_vars, f_table = f
+    largest = max(f_table.values())
+    if largest <= 0:
+        return f
+    return f_vars, {values: p / largest for values, p in f_table.items()}
+
+
+def pedigree_shape(people):
+    """
+    Return the names of people in order and the pedigree shape: for each
+    person, None or the numbers of their mother and father.
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    shape = tuple(
+        (index[people[name]["mother"]], index[people[name]["father"]])
+        if people[name]["mother"] and people[name]["father"] else None
+        for name in names
+    )
+    return names, shape
+
+
+@functools.lru_cache(maxsize=PEDIGREE_CACHE_SIZE)
+def compile_pedigree(shape):
+    """
+    Build a junction tree for a pedigree shape, independent of evidence.
+    The most recently used trees are cached, so families that share a shape
+    and differ only in names and known traits reuse them; callers must not
+    modify the returned tree.
+
+    People are eliminated from the moralized family graph in greedy min-fill
+    order. Eliminating person v creates the clique of v and its remaining
+    neighbours, whose parent clique is that of the next of them to be
+    eliminated. Each person's inheritance factor is assigned to the clique
+    of whichever of its people is eliminated first.
+    """
+    n = len(shape)
+
+    # Moral graph: link each child to both parents and the parents together
+    neighbours = [set() for _ in range(n)]
+    for child, parents in enumerate(shape):
+        if parents:
+            family = (child,) + parents
+            for a in family:
+                neighbours[a].update(b for b in family if b != a)
+
+    def fill_in(v):
+        """
+        Count the links eliminating v would add: pairs of neighbours minus
+        the links already among them. Set intersections keep this linear
+        in v's links for people with many children.
+        """
+        near = neighbours[v]
+        present = sum(len(neighbours[a] & near) for a in near) // 2
+        return len(near) * (len(near) - 1) // 2 - present
+
+    def score(v):
+        return (fill_in(v), len(neighbours[v]), v)
+
+    # Eliminate people, recording the clique each one creates. Scores only
+    # change for neighbours of the eliminated person, so stale heap entries
+    # are skipped rather than rescoring everyone at each step.
+    order = []
+    cliques = []
+    eliminated = [False] * n
+    heap = [score(v) for v in range(n)]
+    heapq.heapify(heap)
+    while heap:
+        entry = heapq.heappop(heap)
+        v = entry[2]
+        if eliminated[v] or entry != score(v):
+            continue
+        near = neighbours[v]
+        for a in near:
+            neighbours[a].update(b for b in near if b != a)
+            neighbours[a].discard(v)
+        eliminated[v] = True
+        order.append(v)
+        cliques.append((v,) + tuple(sorted(near)))
+        for a in near:
+            heapq.heappush(heap, score(a))
+
+    # Connect each clique to the clique of its first eliminated neighbour
+    position = {v: k for k, v in enumerate(order)}
+    parent = [min((position[u] for u in clique[1:]), default=None)
+              for clique in cliques]
+    children = [[] for _ in range(n)]
+    for k, p in enumerate(parent):
+        if p is not None:
+            children[p].append(k)
+
+    # Assign each person's factor to a clique containing its whole scope
+    assigned = [[] for _ in range(n)]
+    for child, parents in enumerate(shape):
+        scope = (child,) + (parents or ())
+        assigned[min(position[v] for v in scope)].append(child)
+
+    return {
+        "shape": shape,
+        "order": order,
+        "cliques": cliques,
+        "parent": parent,
+        "children": children,
+        "assigned": assigned
+    }
+
+
+def person_factor(child, parents, trait):
+    """
+    Return the factor for one person's gene copies given their parents',
+    times the probability of their known trait (if any) given their genes.
+    """
+    def evidence(gene):
+        return 1 if trait is None else PROBS["trait"][gene][trait]
+
+    if parents is None:
+        return (child,), {(g,): PROBS["gene"][g] * evidence(g) for g in GENES}
+    mother, father = parents
+    return (child, mother, father), {
+        (g, m, f): prob_child_gene(g, m, f) * evidence(g)
+        for g, m, f in itertools.product(GENES, repeat=3)
+    }
+
+
+def calibrate(tree, traits):
+    """
+    Run sum-product message passing over a compiled junction tree with the
+    known traits (True, False or None per person) and return each person's
+    unnormalized distribution over gene copies. Every potential and message
+    is rescaled to a largest value of 1, so that large families do not
+    underflow.
+    """
+    cliques = tree["cliques"]
+    parent = tree["parent"]
+    children = tree["children"]
+    unit = ((), {(): 1})
+
+    # Clique potentials from the factors assigned to them
+    potentials = []
+    for k in range(len(cliques)):
+        potential = unit
+        for child in tree["assigned"][k]:
+            factor = person_factor(child, tree["shape"][child], traits[child])
+            potential = rescale(multiply(potential, factor))
+        potentials.append(potential)
+
+    # Upward pass: cliques are eliminated before their parents
+    up = [None] * len(cliques)
+    for k in range(len(cliques)):
+        message = potentials[k]
+        for c in children[k]:
+            message = rescale(multiply(message, up[c]))
+        up[k] = rescale(sum_out(message, cliques[k][1:]))
+
+    # Downward pass from the roots. Each child's message combines the
+    # products of its earlier and later siblings' upward messages, so a
+    # clique with many children costs time linear in their number.
+    down = [unit] * len(cliques)
+    beliefs = [None] * len(cliques)
+    for p in reversed(range(len(cliques))):
+        siblings = children[p]
+        prefix = [rescale(multiply(potentials[p], down[p]))]
+        for c in siblings:
+            prefix.append(rescale(multiply(prefix[-1], up[c])))
+        suffix = unit
+        for i in reversed(range(len(siblings))):
+            message = multiply(prefix[i], suffix)
+            down[siblings[i]] = rescale(sum_out(message, cliques[siblings[i]][1:]))
+            suffix = rescale(multiply(up[siblings[i]], suffix))
+        beliefs[p] = prefix[-1]
+
+    # Each person's marginal comes from the clique created by eliminating them
+    genes = [None] * len(cliques)
+    for k, v in enumerate(tree["order"]):
+        table = sum_out(beliefs[k], (v,))[1]
+        genes[v] = {g: table[(g,)] for g in GENES}
+    return genes
+
+
+def marginals(names, genes, traits):
+    """
+    Turn unnormalized gene distributions into the `probabilities` structure
+    used by `main`, adding each person's trait distribution. Raises
+    ValueError if a distribution has no mass, which means the evidence is
+    impossible or the products underflowed.
+    """
+    probabilities = {}
+    for name, gene, trait in zip(names, genes, traits):
+        total = sum(gene.values())
+        if not total > 0:
+            raise ValueError(f"gene probabilities for {name} sum to {total}")
+        gene = {g: gene[g] / total for g in gene}
+        if trait is None:
+            has_trait = sum(gene[g] * PROBS["trait"][g][True] for g in GENES)
+            trait_probs = {True: has_trait, False: 1 - has_trait}
+        else:
+            trait_probs = {True: float(trait), False: float(not trait)}
+        probabilities[name] = {
+            "gene": {g: gene[g] for g in reversed(GENES)},
+            "trait": trait_probs
+        }
+    return probabilities
+
+
+def elimination_probabilities(people):
+    """
+    Compute every person's gene and trait distributions exactly by treating
+    the family as a Bayesian network and calibrating a junction tree, which
+    takes time linear in family size for tree-shaped pedigrees.
+    """
+    names, shape = pedigree_shape(people)
+    traits = [people[name]["trait"] for name in names]
+    tree = compile_pedigree(shape)
+    return marginals(names, calibrate(tree, traits), traits)
+
+
+def parents_first(people):
+    """
+    Return the names of people ordered so that parents come before children.
+    """
+    order = []
+    seen = set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for parent in (people[name]["mother"], people[name]["father"]):
+            if parent:
+                visit(parent)
+        order.append(name)
+
+    for name in people:
+        visit(name)
+    return order
+
+
+def pruned_probabilities(people):
+    """
+    Compute every person's gene and trait distributions by walking gene
+    assignments person by person, parents first. Each step multiplies the
+    partial product by one person's factor, and branches whose partial
+    product is zero are pruned. Unknown traits are summed out analytically
+    rather than enumerated. Partial products are kept as logs, and totals
+    are kept relative to the largest complete product so far (log-sum-exp
+    with a running maximum), so large families do not underflow.
+    """
+    order = parents_first(people)
+    probabilities = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+    genes = {}
+    scale = -math.inf
+
+    def factor(name, gene):
+        """Log probability of one person's genes given their parents', and of their known trait."""
+        mother, father = people[name]["mother"], people[name]["father"]
+        if mother and father:
+            p = LOG_CHILD_GENE[(gene, genes[mother], genes[father])]
+        else:
+            p = LOG_GENE[gene]
+        trait = people[name]["trait"]
+        if trait is not None:
+            p += LOG_TRAIT[gene][trait]
+        return p
+
+    def walk(position, partial):
+        nonlocal scale
+
+        # Every person has genes: add this assignment's probability
+        if position == len(order):
+            if partial > scale:
+                shrink = math.exp(scale - partial)
+                for distributions in probabilities.values():
+                    for distribution in distributions.values():
+                        for value in distribution:
+                            distribution[value] *= shrink
+                scale = partial
+            p = math.exp(partial - scale)
+
+            for name, gene in genes.items():
+                probabilities[name]["gene"][gene] += p
+                trait = people[name]["trait"]
+                if trait is None:
+                    for value in (True, False):
+                        probabilities[name]["trait"][value] += (
+                            p * PROBS["trait"][gene][value]
+                        )
+                else:
+                    probabilities[name]["trait"][trait] += p
+            return
+
+        name = order[position]
+        for gene in GENES:
+            genes[name] = gene
+            p = partial + factor(name, gene)
+            if p > -math.inf:
+                walk(position + 1, p)
+        del genes[name]
+
+    walk(0, 0)
+    normalize(probabilities)
+    return probabilities
+
+
+def inheritance_tensor():
+    """
+    Return a 3x3x3 NumPy array whose [child, mother, father] entry is the
+    probability of the child's gene copies given the parents', using
+    PROBS["mutation"].
+    """
+    mutation = PROBS["mutation"]
+    # Probability each parent passes the gene on, by their number of copies
+    passes = numpy.array([mutation, 0.5, 1 - mutation])
+    tensor = numpy.empty((3, 3, 3))
+    tensor[0] = numpy.outer(1 - passes, 1 - passes)
+    tensor[1] = numpy.outer(passes, 1 - passes) + numpy.outer(1 - passes, passes)
+    tensor[2] = numpy.outer(passes, passes)
+    return tensor
+
+
+def einsum_probabilities(people):
+    """
+    Compute every person's gene and trait distributions with one NumPy
+    array axis per person's gene copies. Factors are built in log space and
+    rescaled by their largest entry before contraction, and each person's
+    marginal is a numpy.einsum contraction whose order is chosen
+    automatically. Needs numpy, and at most 52 people (einsum's axis limit).
+    """
+    if numpy is None:
+        raise ImportError("the einsum engine requires numpy")
+    names, shape = pedigree_shape(people)
+    if len(names) > 52:
+        raise ValueError("the einsum engine handles at most 52 people")
+    traits = [people[name]["trait"] for name in names]
+
+    log_prior = numpy.log([PROBS["gene"][g] for g in GENES])
+    log_tensor = numpy.log(inheritance_tensor())
+    log_trait = {
+        value: numpy.log([PROBS["trait"][g][value] for g in GENES])
+        for value in (True, False)
+    }
+
+    # One log factor per person, over their axis and their parents' axes
+    operands = []
+    for child, parents in enumerate(shape):
+        if parents is None:
+            factor, axes = log_prior.copy(), [child]
+        else:
+            factor, axes = log_tensor.copy(), [child, parents[0], parents[1]]
+        if traits[child] is not None:
+            factor += log_trait[traits[child]].reshape((3,) + (1,) * (factor.ndim - 1))
+
+        # Leave log space only after scaling the largest entry to 1
+        operands.extend([numpy.exp(factor - factor.max()), axes])
+
+    genes = []
+    for i in range(len(names)):
+        table = numpy.einsum(*operands, [i], optimize="greedy")
+        genes.append({g: float(table[g]) for g in GENES})
+    return marginals(names, genes, traits)
+
+
+def sampling_tables(shape, traits):
+    """
+    Return the lookup tables shared by the samplers: each person's children,
+    an ordering with parents before children, the [child][mother][father]
+    inheritance table, and each person's trait likelihood by gene copies.
+    """
+    children = [[] for _ in shape]
+    for child, parents in enumerate(shape):
+        if parents is not None:
+            for parent in set(parents):
+                children[parent].append(child)
+
+    # Founders first, then anyone whose parents are already placed
+    order = [v for v, parents in enumerate(shape) if parents is None]
+    waiting = [len(set(parents)) if parents else 0 for parents in shape]
+    for v in order:
+        for c in children[v]:
+            waiting[c] -= 1
+            if waiting[c] == 0:
+                order.append(c)
+
+    inherit = [[[prob_child_gene(g, m, f) for f in GENES] for m in GENES] for g in GENES]
+    evidence = [
+        [1 if trait is None else PROBS["trait"][g][trait] for g in GENES]
+        for trait in traits
+    ]
+    return children, order, inherit, evidence
+
+
+def gene_weights(v, genes, shape, children, inherit, evidence):
+    """
+    Return the unnormalized distribution of person v's gene copies given
+    everyone else's (v's Markov blanket), as a list indexed by gene copies.
+    """
+    weights = []
+    for g in GENES:
+        genes[v] = g
+        parents = shape[v]
+        if parents is None:
+            w = PROBS["gene"][g]
+        else:
+            w = inherit[g][genes[parents[0]]][genes[parents[1]]]
+        w *= evidence[v][g]
+        for c in children[v]:
+            mother, father = shape[c]
+            w *= inherit[genes[c]][genes[mother]][genes[father]]
+        weights.append(w)
+    return weights
+
+
+def gibbs_chain(shape, traits, samples, seed):
+    """
+    Run one Gibbs sampling chain over everyone's gene copies, resampling
+    each person from their distribution given the rest of the family.
+    Known traits enter as likelihoods. Returns, per person and gene value,
+    the sum and sum of squares of that conditional probability over each
+    half of the chain (after burn-in), which `split_rhat` compares.
+    """
+    rng = random.Random(seed)
+    children, order, inherit, evidence = sampling_tables(shape, traits)
+
+    # Start from a forward sample, which always has non-zero probability
+    genes = [0] * len(shape)
+    for v in order:
+        parents = shape[v]
+        if parents is None:
+            weights = [PROBS["gene"][g] for g in GENES]
+        else:
+            weights = [inherit[g][genes[parents[0]]][genes[parents[1]]] for g in GENES]
+        genes[v] = rng.choices(GENES, weights)[0]
+
+    halves = [
+        [[[0, 0] for _ in GENES] for _ in shape]
+        for _ in range(2)
+    ]
+    for sweep in range(BURN_IN + samples):
+        kept = sweep - BURN_IN
+        for v in order:
+            weights = gene_weights(v, genes, shape, children, inherit, evidence)
+            genes[v] = rng.choices(GENES, weights)[0]
+
+            # Rao-Blackwellize: record the conditional, not just the draw
+            if kept >= 0:
+                total = sum(weights)
+                stats = halves[2 * kept // samples][v]
+                for g in GENES:
+                    p = weights[g] / total
+                    stats[g][0] += p
+                    stats[g][1] += p * p
+    return halves
+
+
+def weighting_chain(shape, traits, samples, seed):
+    """
+    Draw likelihood-weighted samples: sample gene copies parents first and
+    weight each sample by the probability of the known traits. Weights are
+    kept in log space and totals rescaled to the largest so far. Returns
+    the log scale, the scaled sum of weights and of squared weights, and
+    each person's scaled weight per gene value.
+    """
+    rng = random.Random(seed)
+    children, order, inherit, evidence = sampling_tables(shape, traits)
+    log_evidence = [[math.log(e) for e in row] for row in evidence]
+
+    scale = -math.inf
+    weight_sum = square_sum = 0
+    totals = [[0, 0, 0] for _ in shape]
+    genes = [0] * len(shape)
+    for _ in range(samples):
+        log_weight = 0
+        for v in order:
+            parents = shape[v]
+            if parents is None:
+                weights = [PROBS["gene"][g] for g in GENES]
+            else:
+                weights = [inherit[g][genes[parents[0]]][genes[parents[1]]] for g in GENES]
+            genes[v] = rng.choices(GENES, weights)[0]
+            log_weight += log_evidence[v][genes[v]]
+
+        # Rescale the running totals when this weight is the largest yet
+        if log_weight > scale:
+            shrink = math.exp(scale - log_weight)
+            weight_sum *= shrink
+            square_sum *= shrink * shrink
+            for row in totals:
+                for g in GENES:
+                    row[g] *= shrink
+            scale = log_weight
+        w = math.exp(log_weight - scale)
+        weight_sum += w
+        square_sum += w * w
+        for v, g in enumerate(genes):
+            totals[v][g] += w
+    return scale, weight_sum, square_sum, totals
+
+
+def split_rhat(chains, samples):
+    """
+    Return the split R-hat of each person's gene distribution: every chain
+    is halved and between-half variance compared with within-half
+    variance. Values near 1 mean the chains agree.
+    """
+    n = samples // 2
+    halves = [half for chain in chains for half in chain]
+    rhats = []
+    for v in range(len(halves[0])):
+        worst = 1
+        for g in GENES:
+            means = [half[v][g][0] / n for half in halves]
+            within = sum(
+                (half[v][g][1] - n * mean * mean) / (n - 1)
+                for half, mean in zip(halves, means)
+            ) / len(halves)
+            grand = sum(means) / len(means)
+            between = n * sum((m - grand) ** 2 for m in means) / (len(means) - 1)
+            if within > 0:
+                pooled = (n - 1) / n * within + between / n
+                worst = max(worst, math.sqrt(pooled / within))
+        rhats.append(worst)
+    return rhats
+
+
+SAMPLERS = {
+    "gibbs": gibbs_chain,
+    "weighting": weighting_chain
+}
+
+
+def sample_probabilities(people, sampler="gibbs", samples=SAMPLES, chains=CHAINS, seed=None):
+    """
+    Estimate every person's gene and trait distributions by sampling, for
+    pedigrees too large or too inbred for exact inference. Chains run in
+    parallel processes. Returns the probabilities and diagnostics: the
+    split R-hat per person for Gibbs sampling, or the effective sample size
+    of the pooled weights for likelihood weighting.
+    """
+    names, shape = pedigree_shape(people)
+    traits = [people[name]["trait"] for name in names]
+    samples -= samples % 2
+    jobs = [
+        (shape, traits, samples, None if seed is None else seed + i)
+        for i in range(chains)
+    ]
+    if chains == 1:
+        results = [SAMPLERS[sampler](*jobs[0])]
+    else:
+        with multiprocessing.Pool(min(chains, multiprocessing.cpu_count())) as pool:
+            results = pool.starmap(SAMPLERS[sampler], jobs)
+
+    if sampler == "gibbs":
+        genes = [
+            {g: sum(half[v][g][0] for chain in results for half in chain) for g in GENES}
+            for v in range(len(names))
+        ]
+        diagnostics = {"rhat": dict(zip(names, split_rhat(results, samples)))}
+    else:
+        # Bring every chain's totals onto the largest chain's scale
+        scale = max(result[0] for result in results)
+        weight_sum = square_sum = 0
+        genes = [{g: 0 for g in GENES} for _ in names]
+        for chain_scale, chain_sum, chain_squares, totals in results:
+            shrink = math.exp(chain_scale - scale)
+            weight_sum += chain_sum * shrink
+            square_sum += chain_squares * shrink * shrink
+            for v, row in enumerate(totals):
+                for g in GENES:
+                    genes[v][g] += row[g] * shrink
+        diagnostics = {"ess": weight_sum ** 2 / square_sum}
+    return marginals(names, genes, traits), diagnostics
+
+
+ENGINES = {
+    "enumerate": enumerate_probabilities,
+    "pruned": pruned_probabilities,
+    "elimination": elimination_probabilities,
+    "einsum": einsum_probabilities
+}
+
 if __name__ == "__main__":
     main()
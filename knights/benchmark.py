@@ -0,0 +1,57 @@
+import sys
+import time
+import tracemalloc
+
+from generate import generate_puzzle
+from logic import *
+
+# Largest number of symbols given to backends that enumerate every model
+ENUMERATION_LIMIT = 20
+
+
+def run(knowledge, symbols, backend):
+    """Checks every symbol against the knowledge base with one backend."""
+    return [model_check(knowledge, symbol, backend) for symbol in symbols]
+
+
+def main():
+    if len(sys.argv) not in [1, 2]:
+        sys.exit("Usage: python benchmark.py [max_characters]")
+    max_characters = int(sys.argv[1]) if len(sys.argv) == 2 else 12
+
+    print("characters,statements,symbols,backend,seconds,peak_kib")
+    for characters in range(2, max_characters + 1):
+        statements = 2 * characters
+        knowledge, symbols, solution = generate_puzzle(
+            characters, statements, seed=characters
+        )
+        for backend in BACKENDS:
+            if backend != "sat" and len(symbols) > ENUMERATION_LIMIT:
+                continue
+            if backend == "numpy" and numpy is None:
+                continue
+
+            # Time one run, then measure memory on a second run. tracemalloc
+            # only sees this process, so the parallel backend's workers
+            # are left unmeasured rather than reported as using nothing.
+            start = time.perf_counter()
+            results = run(knowledge, symbols, backend)
+            seconds = time.perf_counter() - start
+            peak_kib = ""
+            if backend != "parallel":
+                tracemalloc.start()
+                run(knowledge, symbols, backend)
+                peak_kib = f"{tracemalloc.get_traced_memory()[1] / 1024:.1f}"
+                tracemalloc.stop()
+
+            # Anything entailed must agree with the hidden solution
+            for symbol, result in zip(symbols, results):
+                if result and not solution[symbol.name]:
+                    sys.exit(f"{backend} entailed false symbol {symbol}")
+
+            print(f"{characters},{statements},{len(symbols)},{backend},"
+                  f"{seconds:.6f},{peak_kib}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import random
+
+from logic import *
+
+
+def character_name(i):
+    """Returns a name for the i-th character: A to Z, then C26, C27, ..."""
+    if i < 26:
+        return chr(ord("A") + i)
+    return f"C{i}"
+
+
+def random_claim(rng, knights, knaves, depth):
+    """Returns a random statement about the characters' roles."""
+    if depth == 0 or rng.random() < 0.4:
+        i = rng.randrange(len(knights))
+        return rng.choice((knights[i], knaves[i]))
+    kind = rng.choice(("and", "or", "not", "same"))
+    if kind == "not":
+        return Not(random_claim(rng, knights, knaves, depth - 1))
+    left = random_claim(rng, knights, knaves, depth - 1)
+    right = random_claim(rng, knights, knaves, depth - 1)
+    if kind == "and":
+        return And(left, right)
+    if kind == "or":
+        return Or(left, right)
+    return Biconditional(left, right)
+
+
+def generate_puzzle(characters, statements, depth=2, seed=None):
+    """
+    Generates a random knights and knaves puzzle with `characters`
+    characters and `statements` statements, each nested at most `depth` deep.
+
+    A hidden role is picked for every character and each statement is
+    made true if its speaker is a knight and false if a knave, so the
+    puzzle always has at least one solution.
+
+    Returns the knowledge base, the list of symbols (knight and knave
+    for each character) and the hidden solution as a dict of symbol names.
+    """
+    rng = random.Random(seed)
+    names = [character_name(i) for i in range(characters)]
+    knights = [Symbol(f"{name} is a Knight") for name in names]
+    knaves = [Symbol(f"{name} is a Knave") for name in names]
+
+    # Pick the hidden roles
+    solution = dict()
+    for knight, knave in zip(knights, knaves):
+        solution[knight.name] = rng.random() < 0.5
+        solution[knave.name] = not solution[knight.name]
+
+    # Puzzle knowledge: every character is exactly one of knight or knave
+    knowledge = []
+    for knight, knave in zip(knights, knaves):
+        knowledge.append(Or(knight, knave))
+        knowledge.append(Not(And(knight, knave)))
+
+    # Statement knowledge: a speaker is a knight exactly when their claim is true
+    for _ in range(statements):
+        speaker = rng.randrange(characters)
+        claim = random_claim(rng, knights, knaves, depth)
+        if claim.evaluate(solution) != solution[knights[speaker].name]:
+            claim = Not(claim)
+        knowledge.append(Biconditional(knights[speaker], claim))
+
+    symbols = [symbol for pair in zip(knights, knaves) for symbol in pair]
+    return And(*knowledge), symbols, solution
@@ -1,7 +1,56 @@
+import functools
 import itertools
+import multiprocessing
+import os
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class Sentence():
+    """
+    Base class for immutable, interned logical sentences.
+
+    Building a sentence equal to one that already exists returns the
+    existing object, so equal sub-formulas are shared, equality is identity
+    and each node's hash and symbol set are computed only once.
+    """
+    __slots__ = ("_args", "_hash", "_symbols", "__weakref__")
+
+    # Every live sentence, keyed by its class and operands
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, *args):
+        """
+        Returns the sentence of this class built from `args` and whether
+        it was newly created, so the caller knows to fill in its fields.
+        """
+        key = (cls, args)
+        sentence = Sentence.interned.get(key)
+        if sentence is not None:
+            return sentence, False
+        sentence = object.__new__(cls)
+        object.__setattr__(sentence, "_args", args)
+        object.__setattr__(sentence, "_hash", hash(key))
+        object.__setattr__(sentence, "_symbols", None)
+        Sentence.interned[key] = sentence
+        return sentence, True
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), self._args)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +62,28 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        if self._symbols is None:
+            object.__setattr__(self, "_symbols", self.find_symbols())
+        return self._symbols
+
+    def find_symbols(self):
+        """Computes the frozenset of symbols cached by `symbols`."""
+        return frozenset()
+
+    def source(self, index):
+        """
+        Returns a Python expression evaluating the sentence over a tuple `m`
+        of truth values, where `index` maps each symbol to its position
+        or to a constant truth value.
+        """
+        raise Exception("nothing to compile")
+
+    def evaluate_array(self, columns):
+        """
+        Evaluates the logical sentence over many models at once, where
+        `columns` maps each symbol to a NumPy boolean array of its values.
+        """
+        raise Exception("nothing to evaluate")
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +113,13 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        sentence, new = cls.intern(name)
+        if new:
+            object.__setattr__(sentence, "name", name)
+        return sentence
 
     def __repr__(self):
         return self.name
@@ -65,20 +133,31 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def find_symbols(self):
+        return frozenset((self.name,))
 
+    def source(self, index):
+        position = index[self.name]
+        if isinstance(position, bool):
+            return str(position)
+        return f"m[{position}]"
 
-class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    def evaluate_array(self, columns):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+class Not(Sentence):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        sentence, new = cls.intern(operand)
+        if new:
+            object.__setattr__(sentence, "operand", operand)
+        return sentence
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +168,26 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
+    def find_symbols(self):
         return self.operand.symbols()
 
+    def source(self, index):
+        return f"(not {self.operand.source(index)})"
+
+    def evaluate_array(self, columns):
+        return numpy.logical_not(self.operand.evaluate_array(columns))
+
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        sentence, new = cls.intern(*conjuncts)
+        if new:
+            object.__setattr__(sentence, "conjuncts", conjuncts)
+        return sentence
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,8 +196,9 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError(
+            "sentences are immutable, use And(*knowledge.conjuncts, conjunct)"
+        )
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,23 +209,35 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def find_symbols(self):
+        return frozenset().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
+        )
+
+    def source(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.source(index) for conjunct in self.conjuncts
+        ) + ")"
+
+    def evaluate_array(self, columns):
+        result = True
+        for conjunct in self.conjuncts:
+            result = numpy.logical_and(result, conjunct.evaluate_array(columns))
+        return result
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        sentence, new = cls.intern(*disjuncts)
+        if new:
+            object.__setattr__(sentence, "disjuncts", disjuncts)
+        return sentence
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,24 +252,36 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def find_symbols(self):
+        return frozenset().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
+        )
+
+    def source(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.source(index) for disjunct in self.disjuncts
+        ) + ")"
+
+    def evaluate_array(self, columns):
+        result = False
+        for disjunct in self.disjuncts:
+            result = numpy.logical_or(result, disjunct.evaluate_array(columns))
+        return result
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        sentence, new = cls.intern(antecedent, consequent)
+        if new:
+            object.__setattr__(sentence, "antecedent", antecedent)
+            object.__setattr__(sentence, "consequent", consequent)
+        return sentence
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +295,32 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def find_symbols(self):
+        return self.antecedent.symbols() | self.consequent.symbols()
+
+    def source(self, index):
+        antecedent = self.antecedent.source(index)
+        consequent = self.consequent.source(index)
+        return f"((not {antecedent}) or {consequent})"
+
+    def evaluate_array(self, columns):
+        return numpy.logical_or(
+            numpy.logical_not(self.antecedent.evaluate_array(columns)),
+            self.consequent.evaluate_array(columns)
+        )
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        sentence, new = cls.intern(left, right)
+        if new:
+            object.__setattr__(sentence, "left", left)
+            object.__setattr__(sentence, "right", right)
+        return sentence
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,43 +336,732 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    def find_symbols(self):
+        return self.left.symbols() | self.right.symbols()
+
+    def source(self, index):
+        return f"({self.left.source(index)} == {self.right.source(index)})"
+
+    def evaluate_array(self, columns):
+        return numpy.equal(self.left.evaluate_array(columns),
+                           self.right.evaluate_array(columns))
+
+
+def compile_sentence(sentence, symbols, fixed=None):
+    """
+    Compiles a sentence into a function of one tuple of truth values,
+    ordered as in `symbols`, with no recursion or dict lookups at call time.
+    Symbols in the dict `fixed` are replaced by their constant truth value.
+    Sentences nested too deeply for Python to compile as one expression
+    fall back to a function calling `sentence.evaluate`.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    if fixed:
+        index.update(fixed)
+    try:
+        return eval(f"lambda m: {sentence.source(index)}")
+    except (SyntaxError, RecursionError, MemoryError):
+        constants = dict(fixed or {})
+        return lambda m: sentence.evaluate({**constants, **dict(zip(symbols, m))})
+
+
+# Constant sentences: an empty conjunction is true, an empty disjunction false
+TRUE = And()
+FALSE = Or()
+
+
+def negate(sentence):
+    """Returns the negation of a simplified sentence, without double negation."""
+    if isinstance(sentence, Not):
+        return sentence.operand
+    if sentence is TRUE:
+        return FALSE
+    if sentence is FALSE:
+        return TRUE
+    return Not(sentence)
+
+
+def simplify(sentence):
+    """
+    Returns an equivalent, usually smaller sentence: nested And/Or are
+    flattened, double negations removed, constants folded, duplicate and
+    complementary operands resolved and absorbed terms dropped.
+    """
+    memo = dict()
+
+    def junction(cls, operands, unit, zero):
+        """Simplifies the operands of an And (or Or) node."""
+        flat = []
+        for operand in operands:
+            operand = visit(operand)
+            if isinstance(operand, cls):
+                flat.extend(operand.conjuncts if cls is And
+                            else operand.disjuncts)
+            else:
+                flat.append(operand)
+
+        # Remove duplicates, keeping the original order
+        flat = list(dict.fromkeys(flat))
+        present = set(flat)
+
+        # A zero or an operand with its complement decides the whole node
+        if zero in present or any(negate(op) in present for op in flat):
+            return zero
+
+        # Absorption: a ∧ (a ∨ b) is a, and a ∨ (a ∧ b) is a
+        inner = Or if cls is And else And
+        flat = [
+            op for op in flat
+            if not (isinstance(op, inner) and present.intersection(
+                op.disjuncts if inner is Or else op.conjuncts
+            ))
+        ]
+        if len(flat) == 1:
+            return flat[0]
+        return cls(*flat) if flat else unit
+
+    def visit(sentence):
+        if sentence in memo:
+            return memo[sentence]
+        if isinstance(sentence, Symbol):
+            result = sentence
+        elif isinstance(sentence, Not):
+            result = negate(visit(sentence.operand))
+        elif isinstance(sentence, And):
+            result = junction(And, sentence.conjuncts, TRUE, FALSE)
+        elif isinstance(sentence, Or):
+            result = junction(Or, sentence.disjuncts, FALSE, TRUE)
+        elif isinstance(sentence, Implication):
+            a = visit(sentence.antecedent)
+            b = visit(sentence.consequent)
+            if a is FALSE or b is TRUE or a is b:
+                result = TRUE
+            elif a is TRUE:
+                result = b
+            elif b is FALSE:
+                result = negate(a)
+            else:
+                result = Implication(a, b)
+        elif isinstance(sentence, Biconditional):
+            a = visit(sentence.left)
+            b = visit(sentence.right)
+            if a is b:
+                result = TRUE
+            elif negate(a) is b:
+                result = FALSE
+            elif a is TRUE or a is FALSE:
+                result = b if a is TRUE else negate(b)
+            elif b is TRUE or b is FALSE:
+                result = a if b is TRUE else negate(a)
+            else:
+                result = Biconditional(a, b)
         else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+            raise TypeError("must be a logical sentence")
+        memo[sentence] = result
+        return result
+
+    return visit(sentence)
+
+
+def to_nnf(sentence):
+    """
+    Returns an equivalent sentence in negation normal form: only And, Or
+    and Not, with Not applied to symbols only.
+    """
+    memo = dict()
+
+    def visit(sentence, positive):
+        key = (sentence, positive)
+        if key in memo:
+            return memo[key]
+        if isinstance(sentence, Symbol):
+            result = sentence if positive else Not(sentence)
+        elif isinstance(sentence, Not):
+            result = visit(sentence.operand, not positive)
+        elif isinstance(sentence, (And, Or)):
+            operands = (sentence.conjuncts if isinstance(sentence, And)
+                        else sentence.disjuncts)
+            operands = [visit(operand, positive) for operand in operands]
+            if isinstance(sentence, And) == positive:
+                result = And(*operands)
+            else:
+                result = Or(*operands)
+        elif isinstance(sentence, Implication):
+            if positive:
+                result = Or(visit(sentence.antecedent, False),
+                            visit(sentence.consequent, True))
+            else:
+                result = And(visit(sentence.antecedent, True),
+                             visit(sentence.consequent, False))
+        elif isinstance(sentence, Biconditional):
+            left, right = sentence.left, sentence.right
+            result = And(
+                Or(visit(left, False), visit(right, positive)),
+                Or(visit(left, True), visit(right, not positive))
+            )
+        else:
+            raise TypeError("must be a logical sentence")
+        memo[key] = result
+        return result
+
+    return simplify(visit(simplify(sentence), True))
+
+
+def to_cnf(sentence):
+    """
+    Returns an equivalent sentence in conjunctive normal form by
+    distributing Or over And. The result can be exponentially larger than
+    the input; Solver uses the linear Tseitin encoding instead.
+    """
+
+    def clauses(sentence):
+        """Returns the clauses of an NNF sentence as lists of literals."""
+        if isinstance(sentence, And):
+            return [clause for conjunct in sentence.conjuncts
+                    for clause in clauses(conjunct)]
+        if isinstance(sentence, Or):
+            result = [[]]
+            for disjunct in sentence.disjuncts:
+                result = [left + right for left in result
+                          for right in clauses(disjunct)]
+            return result
+        return [[sentence]]
+
+    return simplify(And(*[
+        Or(*clause) for clause in clauses(to_nnf(sentence))
+    ]))
+
+
+class Solver():
+    """
+    CDCL SAT solver with two watched literals and 1-UIP clause learning.
+
+    Variables are positive integers and literals are signed integers.
+    Sentences are added through a Tseitin encoding, which gives every
+    sub-formula its own variable so the clause count stays linear.
+    """
+
+    def __init__(self):
+        self.variables = dict()
+        self.definitions = dict()
+        self.clauses = []
+        self.watches = dict()
+        self.assigns = [None]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.increment = 1.0
+        self.unsat = False
+        self.model = None
+
+    def new_variable(self):
+        """Creates a fresh variable and returns it."""
+        self.assigns.append(None)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        var = len(self.assigns) - 1
+        self.watches[var] = []
+        self.watches[-var] = []
+        return var
+
+    def variable(self, name):
+        """Returns the variable for symbol `name`, creating it if needed."""
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to `sentence`, adding its definition."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        x = self.new_variable()
+        if isinstance(sentence, And):
+            parts = [self.literal(c) for c in sentence.conjuncts]
+            for part in parts:
+                self.add_clause([-x, part])
+            self.add_clause([x] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(d) for d in sentence.disjuncts]
+            for part in parts:
+                self.add_clause([x, -part])
+            self.add_clause([-x] + parts)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            self.add_clause([x, a])
+            self.add_clause([x, -b])
+            self.add_clause([-x, -a, b])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            self.add_clause([-x, -a, b])
+            self.add_clause([-x, a, -b])
+            self.add_clause([x, a, b])
+            self.add_clause([x, -a, -b])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.definitions[sentence] = x
+        return x
+
+    def add(self, sentence):
+        """Asserts that `sentence` is true."""
+        Sentence.validate(sentence)
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.add_clause([self.literal(d) for d in sentence.disjuncts])
+        else:
+            self.add_clause([self.literal(sentence)])
+
+    def value(self, lit):
+        """Returns the truth value of a literal, or None if unassigned."""
+        value = self.assigns[abs(lit)]
+        if value is None or lit > 0:
+            return value
+        return not value
+
+    def add_clause(self, lits):
+        """Adds a clause at the root level, simplifying it first."""
+        self.backtrack(0)
+        clause = []
+        for lit in lits:
+            if -lit in clause:
+                return
+            value = self.value(lit)
+            if value is True:
+                return
+            if value is None and lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.unsat = True
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+        else:
+            self.attach(clause)
+
+    def attach(self, clause):
+        """Stores a clause and watches its first two literals."""
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def enqueue(self, lit, reason):
+        """Assigns a literal true at the current decision level."""
+        var = abs(lit)
+        self.assigns[var] = lit > 0
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """Runs unit propagation, returning a conflicting clause index or None."""
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watchers = self.watches[false_lit]
+            kept = []
+            for position, index in enumerate(watchers):
+                clause = self.clauses[index]
+
+                # Keep the false literal in the second watched position
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    kept.append(index)
+                    continue
+
+                # Look for a new literal to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.value(clause[0]) is False:
+                        kept.extend(watchers[position + 1:])
+                        self.watches[false_lit] = kept
+                        return index
+                    self.enqueue(clause[0], index)
+            self.watches[false_lit] = kept
+        return None
+
+    def analyze(self, conflict):
+        """Derives a 1-UIP learned clause and the level to backtrack to."""
+        current = len(self.trail_lim)
+        seen = set()
+        learnt = [None]
+        counter = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in clause:
+                var = abs(q)
+                if q == lit or var in seen or self.level[var] == 0:
+                    continue
+                seen.add(var)
+                self.bump(var)
+                if self.level[var] == current:
+                    counter += 1
+                else:
+                    learnt.append(q)
+
+            # Walk back along the trail to the next literal to resolve on
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reason[abs(lit)]]
+        learnt[0] = -lit
+        self.increment *= 1.05
+
+        # Watch the highest level literal so the clause is unit after backtracking
+        back_level = 0
+        if len(learnt) > 1:
+            top = max(range(1, len(learnt)),
+                      key=lambda k: self.level[abs(learnt[k])])
+            learnt[1], learnt[top] = learnt[top], learnt[1]
+            back_level = self.level[abs(learnt[1])]
+        return learnt, back_level
+
+    def bump(self, var):
+        """Raises the branching priority of a variable seen in a conflict."""
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+
+    def backtrack(self, level):
+        """Undoes all assignments above decision level `level`."""
+        if len(self.trail_lim) <= level:
+            return
+        for lit in self.trail[self.trail_lim[level]:]:
+            var = abs(lit)
+            self.phase[var] = lit > 0
+            self.assigns[var] = None
+            self.reason[var] = None
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def pick_branch(self):
+        """Returns the unassigned variable with highest activity, or None."""
+        best = None
+        for var in range(1, len(self.assigns)):
+            if self.assigns[var] is None and (
+                best is None or self.activity[var] > self.activity[best]
+            ):
+                best = var
+        return best
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, storing a satisfying model in `self.model`.
+        Learned clauses are kept for later calls.
+        """
+        self.backtrack(0)
+        self.model = None
+        if self.unsat:
+            return False
+        conflicts = 0
+        restart = 100
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.unsat = True
+                    return False
+                learnt, back_level = self.analyze(conflict)
+                self.backtrack(back_level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt))
+
+                # Restart on a growing schedule, keeping learned clauses
+                conflicts += 1
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart = int(restart * 1.5)
+                    self.backtrack(0)
+                continue
+
+            # Decide assumptions first, each on its own level
+            if len(self.trail_lim) < len(assumptions):
+                lit = assumptions[len(self.trail_lim)]
+                value = self.value(lit)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    self.enqueue(lit, None)
+                continue
+
+            var = self.pick_branch()
+            if var is None:
+                self.model = {
+                    name: self.assigns[var]
+                    for name, var in self.variables.items()
+                }
+                self.backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.phase[var] else -var, None)
+
+
+def truth_table_check(knowledge, query):
+    """Checks if knowledge base entails query by enumerating every model."""
+
+    # Get all symbols in both knowledge and query, in a fixed order
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    # Compile "knowledge implies query" so each model is one flat call
+    check = compile_sentence(Implication(knowledge, query), symbols)
+
+    # Knowledge entails query if the implication holds in every model
+    models = itertools.product((True, False), repeat=len(symbols))
+    return all(map(check, models))
+
+
+def numpy_check(knowledge, query, chunk_size=None):
+    """
+    Checks if knowledge base entails query by evaluating the whole truth
+    table as NumPy boolean arrays, `chunk_size` rows at a time.
+    """
+    if numpy is None:
+        raise ImportError("the numpy backend requires numpy")
+    if chunk_size is None:
+        chunk_size = NUMPY_CHUNK_SIZE
+
+    # Get all symbols in both knowledge and query, in a fixed order
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    total = 1 << len(symbols)
+
+    # Row r of the truth table assigns symbol i the i-th highest bit of r
+    for start in range(0, total, chunk_size):
+        rows = numpy.arange(start, min(start + chunk_size, total),
+                            dtype=numpy.int64)
+        columns = {
+            symbol: ((rows >> (len(symbols) - 1 - i)) & 1).astype(bool)
+            for i, symbol in enumerate(symbols)
+        }
+
+        # Any row where knowledge holds and query does not is a counter-model
+        if numpy.any(numpy.logical_and(
+            knowledge.evaluate_array(columns),
+            numpy.logical_not(query.evaluate_array(columns))
+        )):
+            return False
+    return True
+
+
+def sat_check(knowledge, query):
+    """Checks if knowledge base entails query, as unsatisfiability of KB ∧ ¬query."""
+    solver = Solver()
+    solver.add(knowledge)
+    return not solver.solve([-solver.literal(query)])
+
+
+class KnowledgeBase():
+    """
+    Incremental knowledge base backed by a single Solver.
+
+    Sentences are encoded once when told, and clauses learned while
+    answering one query are kept for the next, so a sequence of `tell` and
+    `ask` calls never starts again from scratch.
+    """
+
+    def __init__(self, *sentences):
+        self.solver = Solver()
+        self.sentences = []
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        sentence = simplify(sentence)
+        self.sentences.append(sentence)
+        self.solver.add(sentence)
+
+    def literals(self, assumptions):
+        """Returns solver literals for a list of assumed sentences."""
+        return [self.solver.literal(simplify(assumption))
+                for assumption in assumptions]
+
+    def ask(self, query, assumptions=()):
+        """
+        Checks if the knowledge base, together with the sentences in
+        `assumptions`, entails query. Assumptions are not kept afterwards.
+        """
+        query = self.solver.literal(simplify(query))
+        return not self.solver.solve(self.literals(assumptions) + [-query])
+
+    def consistent(self, assumptions=()):
+        """Checks if the knowledge base and `assumptions` can all be true."""
+        return self.solver.solve(self.literals(assumptions))
+
+    def model(self):
+        """Returns a model of the last satisfiable query, or None."""
+        return self.solver.model
+
+    def knowledge(self):
+        """Returns every sentence told so far as a single conjunction."""
+        return And(*self.sentences)
+
+
+# Entailment checked by each parallel_check worker, and its symbols
+worker_sentence = None
+worker_symbols = None
+
+
+def init_worker(knowledge, query, symbols):
+    """Stores the entailment to check in a parallel_check worker."""
+    global worker_sentence, worker_symbols
+    worker_sentence = Implication(knowledge, query)
+    worker_symbols = symbols
+
+
+def check_subspace(prefix):
+    """Checks every model whose first symbols take the truth values `prefix`."""
+    fixed = dict(zip(worker_symbols, prefix))
+    remaining = worker_symbols[len(prefix):]
+    check = compile_sentence(worker_sentence, remaining, fixed)
+    models = itertools.product((True, False), repeat=len(remaining))
+    return all(map(check, models))
+
+
+def parallel_check(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query by fixing the first `split`
+    symbols to each of their 2^split assignments and checking every
+    sub-space in a process pool, stopping as soon as one has a counter-model.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    # Get all symbols in both knowledge and query, in a fixed order
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    # By default make about four sub-spaces per process to balance the load
+    if split is None:
+        split = (4 * processes - 1).bit_length()
+    split = min(split, len(symbols))
+    prefixes = itertools.product((True, False), repeat=split)
+
+    with multiprocessing.Pool(processes, initializer=init_worker,
+                              initargs=(knowledge, query, symbols)) as pool:
+        for result in pool.imap_unordered(check_subspace, prefixes):
+            if not result:
+                return False
+    return True
+
+
+# Largest number of symbols checked by truth table when backend is "auto"
+TRUTH_TABLE_LIMIT = 16
+
+# Largest number of symbols checked with NumPy when backend is "auto"
+NUMPY_LIMIT = 24
+
+# Number of truth table rows evaluated at once by the NumPy backend
+NUMPY_CHUNK_SIZE = 1 << 16
+
+BACKENDS = {
+    "truth_table": truth_table_check,
+    "numpy": numpy_check,
+    "parallel": parallel_check,
+    "sat": sat_check
+}
+
+
+def model_check(knowledge, query, backend="auto"):
+    """
+    Checks if knowledge base entails query.
+
+    `backend` names an entry of BACKENDS; "auto" picks the truth table for
+    small knowledge bases, NumPy (if installed) up to NUMPY_LIMIT symbols
+    and the SAT solver beyond that. Both sentences are simplified first.
+    """
+    knowledge = simplify(knowledge)
+    query = simplify(query)
+    if backend == "auto":
+        symbols = knowledge.symbols() | query.symbols()
+        if len(symbols) <= TRUTH_TABLE_LIMIT:
+            backend = "truth_table"
+        elif len(symbols) <= NUMPY_LIMIT and numpy is not None:
+            backend = "numpy"
+        else:
+            backend = "sat"
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown model checking backend {backend}")
+    return BACKENDS[backend](knowledge, query)
+
+
+# Knowledge bases whose satisfying models satisfying_models keeps
+MODEL_CACHE_SIZE = 32
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def satisfying_models(knowledge):
+    """
+    Returns the symbols of a knowledge base, in a fixed order, and a tuple of
+    every model (a tuple of truth values) in which the knowledge base is true.
+    The most recently used MODEL_CACHE_SIZE results are cached.
+    """
+    simplified = simplify(knowledge)
+    symbols = sorted(simplified.symbols())
+    check = compile_sentence(simplified, symbols)
+    models = itertools.product((True, False), repeat=len(symbols))
+    return symbols, tuple(filter(check, models))
+
+
+def model_check_all(knowledge, queries):
+    """
+    Checks if knowledge base entails each query, enumerating the models of
+    the knowledge base only once. Returns a list of booleans, one per query.
+    With more than TRUTH_TABLE_LIMIT symbols, enumerating and keeping the
+    models in Python costs too much time and memory, so each query is
+    checked by `model_check` instead.
+    """
+    if len(knowledge.symbols()) > TRUTH_TABLE_LIMIT:
+        return [model_check(knowledge, query) for query in queries]
+
+    symbols, models = satisfying_models(knowledge)
+    results = []
+    for query in queries:
+
+        # Symbols only in the query can take any value in each model
+        extra = sorted(query.symbols() - set(symbols))
+        if len(symbols) + len(extra) > TRUTH_TABLE_LIMIT:
+            results.append(model_check(knowledge, query))
+            continue
+        check = compile_sentence(query, symbols + extra)
+        if extra:
+            assignments = list(itertools.product((True, False),
+                                                 repeat=len(extra)))
+            results.append(all(
+                check(model + assignment)
+                for model in models for assignment in assignments
+            ))
+        else:
+            results.append(all(map(check, models)))
+    return results
@@ -92,8 +92,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            entailed = model_check_all(knowledge, symbols)
+            for symbol, result in zip(symbols, entailed):
+                if result:
                     print(f"    {symbol}")
 
 
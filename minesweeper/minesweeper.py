@@ -1,5 +1,7 @@
 import itertools
+import json
 import random
+import time
 
 
 class Minesweeper():
@@ -145,17 +147,81 @@ class Sentence():
         return
 
 
+class InferenceTracer():
+    """
+    Optional profiler for MinesweeperAI
+    Records one entry per call to add_knowledge so knowledge base growth
+    and slow inferences can be inspected afterwards.
+    """
+
+    def __init__(self):
+        # List of finished records, one dictionary per add_knowledge call
+        self.records = []
+
+        # Record currently being filled in, None between calls
+        self.current = None
+
+    def start(self, cell, count):
+        """
+        Begin a new record for a call to add_knowledge.
+        """
+        self.current = {
+            "cell": list(cell),
+            "count": count,
+            "sentences": 0,
+            "comparisons": 0,
+            "derived": 0,
+            "marked": 0,
+            "knowledge_check_time": 0.0,
+            "find_sentences_time": 0.0,
+            "total_time": 0.0
+        }
+
+    def add(self, key, value):
+        """
+        Add `value` to field `key` of the current record.
+        """
+        if self.current is not None:
+            self.current[key] += value
+
+    def finish(self, sentences, marked, total_time):
+        """
+        Close the current record and store it.
+        """
+        self.current["sentences"] = sentences
+        self.current["marked"] = marked
+        self.current["total_time"] = total_time
+        self.records.append(self.current)
+        self.current = None
+
+    def to_json_lines(self):
+        """
+        Return all records as a string of JSON lines.
+        """
+        return "".join(json.dumps(record) + "\n" for record in self.records)
+
+    def export(self, filename):
+        """
+        Write all records to `filename` as JSON lines.
+        """
+        with open(filename, "w") as f:
+            f.write(self.to_json_lines())
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, tracer=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Optional InferenceTracer to profile add_knowledge calls
+        self.tracer = tracer
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -212,6 +278,8 @@ class MinesweeperAI():
 
         # Loop over knowledge base twice
         for sentence1 in self.knowledge:
+            if self.tracer is not None:
+                self.tracer.add("comparisons", len(self.knowledge))
             for sentence2 in self.knowledge:
                 # Check if one sentence is a subset of the other
                 if sentence1.cells < sentence2.cells:
@@ -232,6 +300,29 @@ class MinesweeperAI():
         # Else return None
         return None
 
+    def timed_knowledge_check(self):
+        """
+        Run knowledge_check, recording time spent if a tracer is set
+        """
+        if self.tracer is None:
+            return self.knowledge_check()
+        start = time.perf_counter()
+        self.knowledge_check()
+        self.tracer.add("knowledge_check_time", time.perf_counter() - start)
+
+    def timed_find_sentences(self):
+        """
+        Run find_sentences, recording time spent and sentences derived if a tracer is set
+        """
+        if self.tracer is None:
+            return self.find_sentences()
+        start = time.perf_counter()
+        new_knowledge = self.find_sentences()
+        self.tracer.add("find_sentences_time", time.perf_counter() - start)
+        if new_knowledge != None:
+            self.tracer.add("derived", len(new_knowledge))
+        return new_knowledge
+
     def get_cells(self, cell):
         """
         From a given safe cell, find the coordinates of all cells around it
@@ -272,6 +363,12 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        # Start a trace record if profiling is enabled
+        if self.tracer is not None:
+            self.tracer.start(cell, count)
+            start = time.perf_counter()
+            known = len(self.mines) + len(self.safes)
+
         # Mark the cell as a move made
         self.moves_made.add(cell)
         
@@ -285,13 +382,13 @@ class MinesweeperAI():
         self.knowledge.append(Sentence(cells, count))
         
         # Check through the knowledge base and mark cells safe or mines if it can be done
-        self.knowledge_check()
+        self.timed_knowledge_check()
         
         # Initialise a list to store new sentences
         new_knowledge = []
 
         # Find new sentences by checking for subsets
-        x = self.find_sentences()
+        x = self.timed_find_sentences()
         # Check None is note returned before appending it to the list
         if x != None:
             new_knowledge.extend(x)
@@ -301,15 +398,20 @@ class MinesweeperAI():
             # Add new sentences to knowledge base
             self.knowledge.extend(new_knowledge)
             # Check through the KB for safe cells and mines
-            self.knowledge_check()
+            self.timed_knowledge_check()
             # Clear the list for new sentences to be added
             new_knowledge.clear()
             # Find new sentences again by checking for subsets
-            y = self.find_sentences()
+            y = self.timed_find_sentences()
             # Check None is not returned before appending it to the new_knowledge list
             if y != None:
                 new_knowledge.extend(y)
 
+        # Close the trace record with the final size of the knowledge base
+        if self.tracer is not None:
+            marked = len(self.mines) + len(self.safes) - known
+            self.tracer.finish(len(self.knowledge), marked, time.perf_counter() - start)
+
         return
 
     def make_safe_move(self):
@@ -0,0 +1,83 @@
+import sys
+import tempfile
+import time
+
+from pagerank import *
+
+# Largest corpus given to estimators whose cost grows with pages squared
+QUADRATIC_LIMIT = 2000
+
+# Sample sizes used to show how sampling error falls with n
+SAMPLE_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+
+def report(name, reference, ranks, seconds, trace=None):
+    """Print one row comparing an estimate with the reference ranks."""
+    error = max(abs(ranks[page] - reference[page]) for page in reference)
+    if trace is not None:
+        iterations = str(trace.iterations())
+        residual = f"{trace.residuals[-1]:.2e}"
+    else:
+        iterations = residual = "-"
+    print(f"{name:<24}{iterations:>11}{residual:>11}{seconds:>11.4f}"
+          f"{error:>11.2e}", flush=True)
+
+
+def timed(function, *args, **kwargs):
+    """Call a function and return its result and the seconds taken."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python benchmark.py corpus")
+    corpus = stream_crawl(sys.argv[1])
+    print(f"{len(corpus)} pages, {sum(len(links) for links in corpus.values())} links")
+
+    # Reference ranks from tightly converged power iteration
+    reference = sparse_pagerank(corpus, DAMPING, tolerance=1e-12)
+
+    print(f"{'estimator':<24}{'iterations':>11}{'residual':>11}"
+          f"{'seconds':>11}{'max error':>11}")
+
+    # Iterative solvers
+    for method in SOLVERS:
+        if method == "jacobi" and len(corpus) > QUADRATIC_LIMIT:
+            continue
+        trace = ConvergenceTrace()
+        ranks, seconds = timed(iterate_pagerank, corpus, DAMPING, method, trace)
+        report(method, reference, ranks, seconds, trace)
+
+    trace = ConvergenceTrace()
+    ranks, seconds = timed(sparse_pagerank, corpus, DAMPING, trace=trace)
+    report("sparse", reference, ranks, seconds, trace)
+
+    trace = ConvergenceTrace()
+    uniform = {page: 1 for page in corpus}
+    (ranks,), seconds = timed(personalized_pagerank, corpus, DAMPING,
+                              [uniform], trace=trace)
+    report("personalized (uniform)", reference, ranks, seconds, trace)
+
+    with tempfile.TemporaryDirectory() as store:
+        write_edge_store(store, list(corpus), corpus.items())
+        trace = ConvergenceTrace()
+        (vector, iterations), seconds = timed(out_of_core_pagerank, store,
+                                              DAMPING, trace=trace)
+        ranks = dict(zip(load_pages(store), vector.tolist()))
+        report("out of core", reference, ranks, seconds, trace)
+
+    # Sampling estimators, with error falling as n grows
+    for n in SAMPLE_SIZES:
+        if len(corpus) <= QUADRATIC_LIMIT and n <= SAMPLES * 10:
+            ranks, seconds = timed(sample_pagerank, corpus, DAMPING, n)
+            report(f"sample n={n}", reference, ranks, seconds)
+        ranks, seconds = timed(fast_sample_pagerank, corpus, DAMPING, n)
+        report(f"fast sample n={n}", reference, ranks, seconds)
+    (ranks, intervals), seconds = timed(parallel_sample_pagerank, corpus, DAMPING)
+    report("parallel sample", reference, ranks, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import numpy
+
+# Exponents of the power laws for the number of links on a page and
+# for how popular each page is as a link target
+OUT_EXPONENT = 2.1
+IN_EXPONENT = 1.0
+MAX_LINKS = 100
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{name}</title>
+    </head>
+    <body>
+        <h1>{name}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}
+        </ul>
+    </body>
+</html>
+"""
+
+LINK = '            <li><a href="{target}.html">{target}</a></li>'
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python generate.py directory pages [seed]")
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    generate_corpus(sys.argv[1], int(sys.argv[2]), seed)
+
+
+def power_law_links(pages, seed=None):
+    """
+    Return a list with the set of pages (numbered 0 to pages - 1) that each
+    page links to. Out-degrees follow a Zipf distribution, so every page
+    has at least one link as in the sample corpora, and targets are picked
+    with probability proportional to 1 / (popularity rank) ** IN_EXPONENT.
+    """
+    rng = numpy.random.default_rng(seed)
+    degrees = numpy.minimum(rng.zipf(OUT_EXPONENT, pages), MAX_LINKS)
+    weights = 1 / numpy.arange(1, pages + 1) ** IN_EXPONENT
+    popularity = rng.permutation(pages)
+    targets = popularity[rng.choice(pages, size=degrees.sum(),
+                                    p=weights / weights.sum())]
+    starts = numpy.concatenate(([0], numpy.cumsum(degrees)))
+    links = [set(targets[starts[i]:starts[i + 1]].tolist()) - {i}
+             for i in range(pages)]
+
+    # A page whose only picks were itself links to another page instead
+    for i in range(pages):
+        if not links[i] and pages > 1:
+            links[i].add((i + 1 + int(rng.integers(pages - 1))) % pages)
+    return links
+
+
+def generate_corpus(directory, pages, seed=None):
+    """
+    Write a synthetic power-law corpus of `pages` HTML pages, in the same
+    format as corpus0, corpus1 and corpus2, to `directory`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for i, links in enumerate(power_law_links(pages, seed)):
+        html = PAGE.format(
+            name=i, links="\n".join(LINK.format(target=j) for j in sorted(links))
+        )
+        with open(os.path.join(directory, f"{i}.html"), "w") as f:
+            f.write(html)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,29 @@
+import json
+import multiprocessing
 import os
 import random
 import re
 import sys
+import time
 import numpy
 
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
 DAMPING = 0.85
 SAMPLES = 10000
+THRESHOLD = 0.001
+EXTRAPOLATE = 10
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+BATCH = 1 << 16
+Z_SCORE = 1.96
+CHUNK = 1 << 16
+OVERLAP = 4096
+BLOCK = 1 << 22
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
 
 
 def main():
@@ -22,6 +40,38 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
+class ConvergenceTrace():
+    """
+    Telemetry for iterative PageRank solvers
+    Pass one as `trace` to record the residual of every iteration and
+    the time elapsed since the trace was created.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.residuals = []
+        self.times = []
+
+    def record(self, residual):
+        """
+        Store the residual of one iteration and the time it finished.
+        """
+        self.residuals.append(float(residual))
+        self.times.append(time.perf_counter() - self.start)
+
+    def iterations(self):
+        """
+        Return the number of iterations recorded.
+        """
+        return len(self.residuals)
+
+    def seconds(self):
+        """
+        Return the time from creating the trace to the last iteration.
+        """
+        return self.times[-1] if self.times else 0.0
+
+
 def crawl(directory):
     """
     Parse a directory of HTML pages and check for links to other pages.
@@ -49,7 +99,7 @@ def crawl(directory):
     return pages
 
 
-def transition_model(corpus, page, damping_factor):
+def transition_model(corpus, page, damping_factor, teleport=None):
     """
     Return a probability distribution over which page to visit next,
     given a current page.
@@ -57,7 +107,12 @@ def transition_model(corpus, page, damping_factor):
     With probability `damping_factor`, choose a link at random
     linked to by `page`. With probability `1 - damping_factor`, choose
     a link at random chosen from all pages in the corpus.
+
+    If `teleport` is a dictionary of probabilities over pages, random jumps
+    (and every move from a page with no links) follow it instead.
     """
+    if teleport is not None:
+        return personalized_transition(corpus, page, damping_factor, teleport)
     
     # Initialise variables, lists and dicts
     pageLinks = len(corpus[page])
@@ -91,6 +146,21 @@ def transition_model(corpus, page, damping_factor):
     return output
 
 
+def personalized_transition(corpus, page, damping_factor, teleport):
+    """
+    Return the transition model for `page` when random jumps follow the
+    `teleport` distribution rather than being uniform.
+    """
+    # A page with no links always jumps
+    if len(corpus[page]) == 0:
+        return {key: teleport.get(key, 0) for key in corpus}
+
+    output = {key: (1 - damping_factor) * teleport.get(key, 0) for key in corpus}
+    for link in corpus[page]:
+        output[link] += damping_factor / len(corpus[page])
+    return output
+
+
 def sample_pagerank(corpus, damping_factor, n):
     """
     Return PageRank values for each page by sampling `n` pages
@@ -138,7 +208,7 @@ def sample_pagerank(corpus, damping_factor, n):
     return output
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, method="jacobi", trace=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -146,6 +216,21 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `method` names the solver in SOLVERS used to iterate, and `trace`
+    is an optional ConvergenceTrace.
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"unknown PageRank solver {method}")
+    ranks, iterations = SOLVERS[method](corpus, damping_factor, trace)
+    return ranks
+
+
+def jacobi_pagerank(corpus, damping_factor, trace=None):
+    """
+    Iterate PageRank by updating every page from the previous iteration's
+    values until no page changes by more than THRESHOLD.
+    Return the PageRank dictionary and the number of iterations.
     """
     # Total number of pages
     totalPages = len(corpus)
@@ -176,7 +261,9 @@ def iterate_pagerank(corpus, damping_factor):
     # Loop through corpus and calculate new PageRanks
     # Only break out of the while loop when PageRank values converge
     converged = False
+    iterations = 0
     while (converged == False):
+        iterations += 1
         # Caluclate New PageRanks based on old PageRanks
         # PR(p) = 1-d/n + d*SUM(PR(i)/out(i)) + d*SUM(PR(x)/n)
         # d = damping factor, n = total number of pages
@@ -211,17 +298,791 @@ def iterate_pagerank(corpus, damping_factor):
         for pg in pageRanks:
             pageRanks[pg] = newPR[pg]
         
+        # Record the largest change if tracing
+        if trace is not None:
+            trace.record(max(diff.values()))
+
         # Check the difference between old PageRank and new PageRank
         diff_check = 0
         for page in diff:
-            if diff[page] <= 0.001:
+            if diff[page] <= THRESHOLD:
                 diff_check += 1
         if diff_check == totalPages:
             converged = True
     
     # Return the final PageRanks for each page
-    return pageRanks
+    return pageRanks, iterations
+
+
+
+def link_arrays(corpus):
+    """
+    Number the pages of `corpus` in order and return the list of pages,
+    NumPy arrays holding the source and destination number of every link,
+    and an array of how many links go out of each page.
+    Links to pages outside the corpus are ignored.
+    """
+    pages = list(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    src = numpy.fromiter(
+        (index[page] for page in pages for link in corpus[page] if link in index),
+        dtype=numpy.int64
+    )
+    dst = numpy.fromiter(
+        (index[link] for page in pages for link in corpus[page] if link in index),
+        dtype=numpy.int64
+    )
+    outdegree = numpy.bincount(src, minlength=len(pages))
+    return pages, src, dst, outdegree
+
+
+def transition_operator(src, dst, outdegree, n):
+    """
+    Return a function mapping a vector of PageRanks to the rank each page
+    receives through links, i.e. SUM(PR(i)/out(i)) over pages i linking to it.
+    Uses a scipy CSR matrix when scipy is installed, else numpy.bincount.
+    """
+    weights = 1 / outdegree[src]
+    if scipy is not None:
+        matrix = scipy.sparse.csr_matrix((weights, (dst, src)), shape=(n, n))
+        return lambda ranks: matrix @ ranks
+
+    def spread(ranks):
+        if ranks.ndim == 1:
+            return numpy.bincount(dst, weights=ranks[src] * weights,
+                                  minlength=n)
+        # One column per rank vector
+        result = numpy.zeros((n,) + ranks.shape[1:])
+        numpy.add.at(result, dst, ranks[src] * weights[:, None])
+        return result
+    return spread
+
+
+def power_iteration(spread, sinks, damping_factor, ranks,
+                    tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                    trace=None):
+    """
+    Run PageRank power iteration from the vector `ranks` until the L1
+    change between iterations is at most `tolerance`.
+    `spread` comes from transition_operator and `sinks` marks pages with no links.
+    Return the final vector and the number of iterations taken.
+    Residuals are recorded in `trace`, an optional ConvergenceTrace.
+    """
+    n = len(ranks)
+    for iteration in range(1, max_iterations + 1):
+        # PR(p) = 1-d/n + d*SUM(PR(i)/out(i)) + d*SUM(PR(x)/n)
+        new = (damping_factor * (spread(ranks) + ranks[sinks].sum() / n)
+               + (1 - damping_factor) / n)
+        change = numpy.abs(new - ranks).sum()
+        ranks = new
+        if trace is not None:
+            trace.record(change)
+        if change <= tolerance:
+            break
+    return ranks, iteration
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE, trace=None):
+    """
+    Return PageRank values for each page like `iterate_pagerank`, but
+    build a sparse transition matrix once and run vectorized power
+    iteration until the L1 change is at most `tolerance`.
+    """
+    pages, src, dst, outdegree = link_arrays(corpus)
+    n = len(pages)
+    spread = transition_operator(src, dst, outdegree, n)
+    ranks, iterations = power_iteration(
+        spread, outdegree == 0, damping_factor, numpy.full(n, 1 / n),
+        tolerance, trace=trace
+    )
+    return dict(zip(pages, ranks.tolist()))
+
+
+def link_table(pages, src, dst, outdegree):
+    """
+    Return the outgoing links of every page as flat Python lists:
+    page i links to targets[offsets[i]:offsets[i] + degrees[i]].
+    """
+    order = numpy.argsort(src, kind="stable")
+    targets = dst[order].tolist()
+    offsets = numpy.concatenate(([0], numpy.cumsum(outdegree)[:-1])).tolist()
+    return targets, offsets, outdegree.tolist()
+
+
+def fast_sample_pagerank(corpus, damping_factor, n, seed=None):
+    """
+    Return PageRank values for each page like `sample_pagerank`, but build
+    the link table once so each step of the walk is O(1): a damping coin
+    flip, then a uniform pick among the page's links or among all pages.
+    Random numbers are drawn in vectorized batches of BATCH steps.
+    """
+    rng = numpy.random.default_rng(seed)
+    pages, src, dst, outdegree = link_arrays(corpus)
+    table = link_table(pages, src, dst, outdegree)
+    counts = random_walk(table, damping_factor, n, rng)
+    return dict(zip(pages, (counts / n).tolist()))
+
+
+def random_walk(table, damping_factor, n, rng):
+    """
+    Walk `n` steps over the link table from `link_table`, starting at a
+    random page, and return an array counting the visits to each page.
+    """
+    targets, offsets, degrees = table
+    total = len(degrees)
+    counts = numpy.zeros(total, dtype=numpy.int64)
+
+    # Choose the first page at random
+    page = int(rng.integers(total))
+
+    for start in range(0, n, BATCH):
+        size = min(BATCH, n - start)
+        follow = (rng.random(size) < damping_factor).tolist()
+        picks = rng.random(size).tolist()
+        visited = [0] * size
+        for k in range(size):
+            visited[k] = page
+            degree = degrees[page]
+            # Follow a link on the page, or jump to any page (always from a sink)
+            if follow[k] and degree:
+                page = targets[offsets[page] + int(picks[k] * degree)]
+            else:
+                page = int(picks[k] * total)
+        counts += numpy.bincount(visited, minlength=total)
+
+    return counts
+
+
+# Link table and damping factor shared by parallel_sample_pagerank workers
+worker_table = None
+worker_damping = None
+
+
+def init_walker(table, damping_factor):
+    """Store the link table once in each parallel_sample_pagerank worker."""
+    global worker_table, worker_damping
+    worker_table = table
+    worker_damping = damping_factor
+
+
+def walker(task):
+    """Run one independent seeded walk and return its visit frequencies."""
+    seed, steps = task
+    rng = numpy.random.default_rng(seed)
+    return random_walk(worker_table, worker_damping, steps, rng) / steps
+
+
+def parallel_sample_pagerank(corpus, damping_factor, width=0.005, walkers=None,
+                             steps=SAMPLES, max_rounds=100, processes=None,
+                             seed=None):
+    """
+    Estimate PageRank with many independent seeded random walks of `steps`
+    samples each, run in a process pool. Rounds of `walkers` walks are
+    added until every page's 95% confidence interval is at most `width`
+    wide, or after `max_rounds` rounds.
+
+    Return two dictionaries keyed by page: the estimated PageRank, and
+    its confidence interval as a (low, high) tuple.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if walkers is None:
+        walkers = max(2, processes)
+    pages, src, dst, outdegree = link_arrays(corpus)
+    table = link_table(pages, src, dst, outdegree)
+    seeds = numpy.random.SeedSequence(seed)
+
+    # Running sums of each walk's visit frequencies and their squares
+    total = numpy.zeros(len(pages))
+    squares = numpy.zeros(len(pages))
+    count = 0
+
+    with multiprocessing.Pool(processes, initializer=init_walker,
+                              initargs=(table, damping_factor)) as pool:
+        for _ in range(max_rounds):
+            tasks = [(child, steps) for child in seeds.spawn(walkers)]
+            for frequencies in pool.imap_unordered(walker, tasks):
+                total += frequencies
+                squares += frequencies ** 2
+                count += 1
+
+            # Standard error of the mean over independent walks
+            mean = total / count
+            variance = numpy.maximum(squares / count - mean ** 2, 0)
+            margin = Z_SCORE * numpy.sqrt(variance / (count - 1))
+            if 2 * margin.max() <= width:
+                break
+
+    ranks = dict(zip(pages, mean.tolist()))
+    intervals = dict(zip(pages, zip((mean - margin).tolist(),
+                                    (mean + margin).tolist())))
+    return ranks, intervals
+
+
+def html_files(directory):
+    """
+    Return the paths of every HTML file under `directory`, recursively,
+    relative to it and with "/" separators.
+    """
+    files = []
+    for root, dirs, filenames in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(".html"):
+                path = os.path.relpath(os.path.join(root, filename), directory)
+                files.append(path.replace(os.sep, "/"))
+    return files
+
+
+def extract_links(task):
+    """
+    Read one HTML file in chunks of CHUNK characters and return its page
+    name with the set of pages it links to, resolved relative to the page.
+    Only the last OVERLAP characters are carried between chunks, so links
+    inside longer tags may be missed.
+    """
+    directory, page = task
+    base = os.path.dirname(page)
+    links = set()
+    tail = ""
+    with open(os.path.join(directory, page)) as f:
+        while True:
+            chunk = f.read(CHUNK)
+            if not chunk:
+                break
+            buffer = tail + chunk
+            end = 0
+            for match in LINK.finditer(buffer):
+                links.add(match.group(1))
+                end = match.end()
+            tail = buffer[max(end, len(buffer) - OVERLAP):]
+    resolved = set(
+        os.path.normpath(os.path.join(base, link)).replace(os.sep, "/")
+        for link in links
+    )
+    return page, resolved - {page}
+
+
+def save_edges(filename, pages, src, dst, directory=""):
+    """
+    Save a numbered edge list to `filename` as compressed NumPy arrays,
+    recording the corpus `directory` it was crawled from, if any.
+    """
+    with open(filename, "wb") as f:
+        numpy.savez_compressed(f, pages=numpy.array(pages, dtype=str),
+                               src=src.astype(numpy.int32),
+                               dst=dst.astype(numpy.int32),
+                               directory=numpy.array(directory))
+
+
+def edges_directory(filename):
+    """Return the corpus directory recorded by `save_edges`, or ""."""
+    with numpy.load(filename) as data:
+        return str(data["directory"]) if "directory" in data else ""
+
+
+def load_edges(filename):
+    """Load an edge list saved by `save_edges` as pages, src and dst."""
+    with numpy.load(filename) as data:
+        return (data["pages"].tolist(), data["src"].astype(numpy.int64),
+                data["dst"].astype(numpy.int64))
+
+
+def corpus_from_edges(pages, src, dst):
+    """Rebuild a corpus dictionary, as returned by `crawl`, from an edge list."""
+    corpus = {page: set() for page in pages}
+    for i, j in zip(src.tolist(), dst.tolist()):
+        corpus[pages[i]].add(pages[j])
+    return corpus
+
+
+def stream_crawl(directory, cache=None, processes=None):
+    """
+    Parse every HTML page under `directory`, including subdirectories, in a
+    process pool and return a corpus dictionary like `crawl`. Pages are
+    named by their path relative to `directory`.
+
+    If `cache` is a filename, the edge list is saved there, and later calls
+    load it instead of parsing as long as it was saved for this directory,
+    lists exactly the HTML files there now, and no file is newer than it.
+    """
+    files = html_files(directory)
+    source = os.path.abspath(directory)
+    if cache is not None and os.path.exists(cache):
+        newest = max((os.path.getmtime(os.path.join(directory, page))
+                      for page in files), default=0)
+        if (os.path.getmtime(cache) >= newest
+                and edges_directory(cache) == source):
+            pages, src, dst = load_edges(cache)
+            if pages == files:
+                return corpus_from_edges(pages, src, dst)
+
+    pages = dict()
+    tasks = [(directory, page) for page in files]
+    with multiprocessing.Pool(processes) as pool:
+        for page, links in pool.imap_unordered(extract_links, tasks,
+                                               chunksize=64):
+            pages[page] = links
+
+    # Only include links to other pages in the corpus, in file order
+    corpus = {page: set(link for link in pages[page] if link in pages)
+              for page in files}
+
+    if cache is not None:
+        save_edges(cache, *link_arrays(corpus)[:3], directory=source)
+    return corpus
+
+
+def save_ranks(filename, ranks):
+    """Save a dictionary of PageRanks to `filename` as NumPy arrays."""
+    with open(filename, "wb") as f:
+        numpy.savez(f, pages=numpy.array(list(ranks), dtype=str),
+                    ranks=numpy.array(list(ranks.values())))
+
+
+def load_ranks(filename):
+    """Load a dictionary of PageRanks saved by `save_ranks`."""
+    with numpy.load(filename) as data:
+        return dict(zip(data["pages"].tolist(), data["ranks"].tolist()))
+
+
+def apply_edge_changes(pages, src, dst, added=(), removed=()):
+    """
+    Return the pages, src and dst of an edge list after adding and removing
+    (page, link) pairs. Pages not seen before are numbered after the others.
+    """
+    pages = list(pages)
+    index = {page: i for i, page in enumerate(pages)}
+    for pair in added:
+        for page in pair:
+            if page not in index:
+                index[page] = len(pages)
+                pages.append(page)
+    n = len(pages)
+
+    # Encode each edge as one integer so changes are set operations
+    keys = src * n + dst
+    if removed:
+        gone = numpy.array([index[page] * n + index[link]
+                            for page, link in removed
+                            if page in index and link in index],
+                           dtype=numpy.int64)
+        keys = keys[~numpy.isin(keys, gone)]
+    if added:
+        new = numpy.array([index[page] * n + index[link]
+                           for page, link in added if page != link],
+                          dtype=numpy.int64)
+        keys = numpy.unique(numpy.concatenate((keys, new)))
+    return pages, keys // n, keys % n
+
+
+def affected_region(src, dst, n, seeds, radius=None):
+    """
+    Return a boolean mask of the pages within `radius` links downstream of
+    the page numbers in `seeds` (all reachable pages if `radius` is None).
+    """
+    region = numpy.zeros(n, dtype=bool)
+    region[list(seeds)] = True
+    frontier = region.copy()
+    hops = 0
+    while frontier.any() and (radius is None or hops < radius):
+        reached = numpy.zeros(n, dtype=bool)
+        reached[dst[frontier[src]]] = True
+        frontier = reached & ~region
+        region |= reached
+        hops += 1
+    return region
+
+
+def local_power_iteration(src, dst, outdegree, damping_factor, ranks, region,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                          trace=None):
+    """
+    Run power iteration only for the pages in the boolean mask `region`,
+    holding every other page at its rank in `ranks` so that links from
+    outside the region contribute a fixed amount. The result is
+    renormalized to sum to 1. Return the vector and the iterations taken.
+    """
+    n = len(ranks)
+    sinks = outdegree == 0
+    ids = numpy.flatnonzero(region)
+    local = numpy.full(n, -1, dtype=numpy.int64)
+    local[ids] = numpy.arange(len(ids))
+
+    # Split links into the region by whether their source is also inside it
+    into = region[dst]
+    inner = into & region[src]
+    outer = into & ~region[src]
+    fixed = numpy.bincount(
+        local[dst[outer]], weights=ranks[src[outer]] / outdegree[src[outer]],
+        minlength=len(ids)
+    )
+    fixed_sinks = ranks[sinks & ~region].sum()
+    lsrc = local[src[inner]]
+    ldst = local[dst[inner]]
+    weights = 1 / outdegree[src[inner]]
+    local_sinks = sinks[ids]
+
+    values = ranks[ids]
+    for iteration in range(1, max_iterations + 1):
+        inflow = numpy.bincount(ldst, weights=values[lsrc] * weights,
+                                minlength=len(ids)) + fixed
+        sink = fixed_sinks + values[local_sinks].sum()
+        new = (damping_factor * (inflow + sink / n)
+               + (1 - damping_factor) / n)
+        change = numpy.abs(new - values).sum()
+        values = new
+        if trace is not None:
+            trace.record(change)
+        if change <= tolerance:
+            break
+
+    ranks = ranks.copy()
+    ranks[ids] = values
+    return ranks / ranks.sum(), iteration
+
+
+def incremental_pagerank(ranks, edges, damping_factor, added=(), removed=(),
+                         tolerance=TOLERANCE, local=False, radius=None,
+                         trace=None):
+    """
+    Update PageRanks after links change, starting power iteration from the
+    previous `ranks` dictionary instead of from 1/N.
+
+    `edges` is the previous (pages, src, dst) edge list, as from `load_edges`,
+    and `added` and `removed` are (page, link) pairs. With `local`, only pages
+    within `radius` links downstream of a change are recomputed, which is
+    approximate but touches much less of the graph. Adding pages changes
+    every page's teleport share, so then the whole graph is recomputed
+    even with `local`.
+
+    Return the new PageRank dictionary and the new edge list.
+    """
+    pages, src, dst = apply_edge_changes(*edges, added, removed)
+    n = len(pages)
+    outdegree = numpy.bincount(src, minlength=n)
+
+    # Warm start from the old ranks, giving new pages 1/N
+    start = numpy.array([ranks.get(page, 1 / n) for page in pages])
+    start /= start.sum()
+
+    if local and n == len(edges[0]):
+        index = {page: i for i, page in enumerate(pages)}
+        seeds = set(index[page] for pair in list(added) + list(removed)
+                    for page in pair if page in index)
+        region = affected_region(src, dst, n, seeds, radius)
+        result, iterations = local_power_iteration(
+            src, dst, outdegree, damping_factor, start, region, tolerance,
+            trace=trace
+        )
+    else:
+        spread = transition_operator(src, dst, outdegree, n)
+        result, iterations = power_iteration(
+            spread, outdegree == 0, damping_factor, start, tolerance,
+            trace=trace
+        )
+    return dict(zip(pages, result.tolist())), (pages, src, dst)
+
+
+def gauss_seidel_pagerank(corpus, damping_factor, trace=None):
+    """
+    Iterate PageRank updating pages in place, so each update already uses
+    the new values of pages earlier in the sweep, until no page changes by
+    more than THRESHOLD. Return the PageRank dictionary and the iterations.
+    """
+    pages, src, dst, outdegree = link_arrays(corpus)
+    n = len(pages)
+
+    # Inlinks of every page as flat lists, grouped by destination
+    order = numpy.argsort(dst, kind="stable")
+    sources = src[order].tolist()
+    starts = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(dst, minlength=n)))).tolist()
+    out = outdegree.tolist()
+    sinks = [i for i in range(n) if out[i] == 0]
+
+    ranks = [1 / n] * n
+    iterations = 0
+    while iterations < MAX_ITERATIONS:
+        iterations += 1
+        old = ranks.copy()
+        sinkSum = sum(ranks[i] for i in sinks)
+        for page in range(n):
+            eSum = 0.0
+            for i in sources[starts[page]:starts[page + 1]]:
+                eSum += ranks[i] / out[i]
+            new = (1 - damping_factor) / n + damping_factor * (eSum + sinkSum / n)
+            # Keep the sink sum current as sinks are updated
+            if out[page] == 0:
+                sinkSum += new - ranks[page]
+            ranks[page] = new
+
+        # Renormalize, since in-place updates do not preserve the total
+        total = sum(ranks)
+        ranks = [rank / total for rank in ranks]
+        change = max(abs(a - b) for a, b in zip(ranks, old))
+        if trace is not None:
+            trace.record(change)
+        if change <= THRESHOLD:
+            break
+    return dict(zip(pages, ranks)), iterations
+
+
+def aitken(x0, x1, x2):
+    """Aitken delta-squared extrapolation of three successive iterates."""
+    denominator = x2 - 2 * x1 + x0
+    safe = numpy.abs(denominator) > 1e-15
+    result = x2.copy()
+    result[safe] = x2[safe] - (x2[safe] - x1[safe]) ** 2 / denominator[safe]
+    return result
+
+
+def quadratic(x0, x1, x2, x3):
+    """Quadratic extrapolation of four successive iterates (Kamvar et al.)."""
+    y = numpy.column_stack((x1 - x0, x2 - x0))
+    gamma, *_ = numpy.linalg.lstsq(y, -(x3 - x0), rcond=None)
+    g1, g2, g3 = gamma[0], gamma[1], 1.0
+    return (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+
+
+def extrapolated_iteration(corpus, damping_factor, extrapolate, history,
+                           trace=None):
+    """
+    Run power iteration, replacing the current vector every EXTRAPOLATE
+    iterations with `extrapolate` applied to the last `history` iterates,
+    until no page changes by more than THRESHOLD.
+    Return the PageRank dictionary and the iterations.
+    """
+    pages, src, dst, outdegree = link_arrays(corpus)
+    n = len(pages)
+    spread = transition_operator(src, dst, outdegree, n)
+    sinks = outdegree == 0
+    ranks = numpy.full(n, 1 / n)
+    iterates = [ranks]
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        new = (damping_factor * (spread(ranks) + ranks[sinks].sum() / n)
+               + (1 - damping_factor) / n)
+        change = numpy.abs(new - ranks).max()
+        ranks = new
+        if trace is not None:
+            trace.record(change)
+        if change <= THRESHOLD:
+            break
+        iterates = (iterates + [ranks])[-history:]
+        if iteration % EXTRAPOLATE == 0 and len(iterates) == history:
+            ranks = numpy.abs(extrapolate(*iterates))
+            ranks /= ranks.sum()
+            iterates = [ranks]
+    return dict(zip(pages, ranks.tolist())), iteration
+
+
+def aitken_pagerank(corpus, damping_factor, trace=None):
+    """Power iteration with periodic Aitken extrapolation."""
+    return extrapolated_iteration(corpus, damping_factor, aitken, 3, trace)
+
+
+def quadratic_pagerank(corpus, damping_factor, trace=None):
+    """Power iteration with periodic quadratic extrapolation."""
+    return extrapolated_iteration(corpus, damping_factor, quadratic, 4, trace)
+
+
+def adaptive_pagerank(corpus, damping_factor, trace=None):
+    """
+    Power iteration that stops recomputing pages once their change relative
+    to their rank falls to THRESHOLD, only updating the remaining pages
+    (Kamvar et al.). Once the active pages settle, every page is updated
+    again, and iteration only stops when that full sweep changes no page
+    by more than THRESHOLD.
+    Return the PageRank dictionary and the iterations.
+    """
+    pages, src, dst, outdegree = link_arrays(corpus)
+    n = len(pages)
+    sinks = outdegree == 0
+    weights = 1 / outdegree[src]
+    ranks = numpy.full(n, 1 / n)
+    active = numpy.ones(n, dtype=bool)
+    edges = numpy.ones(len(src), dtype=bool)
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        # Only links into pages that have not converged are summed
+        inflow = numpy.bincount(dst[edges], weights=ranks[src[edges]] * weights[edges],
+                                minlength=n)
+        new = ranks.copy()
+        new[active] = (damping_factor * (inflow[active] + ranks[sinks].sum() / n)
+                       + (1 - damping_factor) / n)
+        change = numpy.abs(new - ranks)
+        ranks = new
+        if trace is not None:
+            trace.record(change.max())
+        if change.max() <= THRESHOLD:
+            if active.all():
+                break
+
+            # Frozen pages report no change, so confirm convergence with a
+            # sweep over every page before stopping
+            active[:] = True
+            edges[:] = True
+            continue
+
+        # Freeze pages whose change relative to their rank has converged
+        active &= change > THRESHOLD * ranks
+        edges = active[dst]
+    return dict(zip(pages, (ranks / ranks.sum()).tolist())), iteration
+
+
+SOLVERS = {
+    "jacobi": jacobi_pagerank,
+    "gauss_seidel": gauss_seidel_pagerank,
+    "aitken": aitken_pagerank,
+    "quadratic": quadratic_pagerank,
+    "adaptive": adaptive_pagerank
+}
+
+
+def write_edge_store(store, pages, adjacency):
+    """
+    Write a graph to the directory `store` for out-of-core PageRank:
+    pages.txt lists page names one per line (a page's ID is its line number),
+    edges.bin holds (src, dst) ID pairs sorted by src then dst, and
+    outdegree.npy counts the links out of each page.
+
+    `adjacency` yields (page, links) pairs in the same order as `pages`, so
+    edges are written as they arrive and never all held in memory.
+    Links to pages not in `pages` are ignored.
+    """
+    os.makedirs(store, exist_ok=True)
+    index = {page: i for i, page in enumerate(pages)}
+    dtype = numpy.int32 if len(pages) < 2 ** 31 else numpy.int64
+    outdegree = numpy.zeros(len(pages), dtype=numpy.int64)
+    edges = 0
+
+    with open(os.path.join(store, "pages.txt"), "w") as f:
+        for page in pages:
+            f.write(page + "\n")
+
+    with open(os.path.join(store, "edges.bin"), "wb") as f:
+        for page, links in adjacency:
+            i = index[page]
+            targets = sorted(index[link] for link in links
+                             if link in index and link != page)
+            pairs = numpy.empty((len(targets), 2), dtype=dtype)
+            pairs[:, 0] = i
+            pairs[:, 1] = targets
+            f.write(pairs.tobytes())
+            outdegree[i] = len(targets)
+            edges += len(targets)
+
+    numpy.save(os.path.join(store, "outdegree.npy"), outdegree)
+    with open(os.path.join(store, "meta.json"), "w") as f:
+        json.dump({"pages": len(pages), "edges": edges,
+                   "dtype": numpy.dtype(dtype).name}, f)
+
+
+def build_edge_store(directory, store, processes=None):
+    """
+    Parse every HTML page under `directory` in a process pool and write the
+    links straight to an edge store (see `write_edge_store`), so the corpus
+    never has to fit in memory as a dictionary.
+    """
+    pages = html_files(directory)
+    tasks = [(directory, page) for page in pages]
+    with multiprocessing.Pool(processes) as pool:
+        write_edge_store(store, pages,
+                         pool.imap(extract_links, tasks, chunksize=64))
+
+
+def load_pages(store):
+    """Return the list of page names of an edge store, indexed by page ID."""
+    with open(os.path.join(store, "pages.txt")) as f:
+        return f.read().splitlines()
+
+
+def out_of_core_pagerank(store, damping_factor, tolerance=TOLERANCE,
+                         block=BLOCK, max_iterations=MAX_ITERATIONS,
+                         trace=None):
+    """
+    Run power iteration over an edge store written by `write_edge_store`.
+    The edges are memory-mapped and streamed `block` edges at a time, so
+    only the rank vectors are held in memory.
+
+    Return a NumPy array of PageRanks indexed by page ID (names are given
+    by `load_pages`) and the number of iterations.
+    """
+    with open(os.path.join(store, "meta.json")) as f:
+        meta = json.load(f)
+    n = meta["pages"]
+    outdegree = numpy.load(os.path.join(store, "outdegree.npy"))
+    sinks = outdegree == 0
+
+    # An empty file cannot be mapped; with no links every page is a sink
+    if meta["edges"]:
+        edges = numpy.memmap(os.path.join(store, "edges.bin"), mode="r",
+                             dtype=meta["dtype"], shape=(meta["edges"], 2))
+
+    ranks = numpy.full(n, 1 / n)
+    for iteration in range(1, max_iterations + 1):
+        share = ranks / numpy.maximum(outdegree, 1)
+        inflow = numpy.zeros(n)
+        for start in range(0, meta["edges"], block):
+            pairs = numpy.asarray(edges[start:start + block])
+            inflow += numpy.bincount(pairs[:, 1], weights=share[pairs[:, 0]],
+                                     minlength=n)
+        new = (damping_factor * (inflow + ranks[sinks].sum() / n)
+               + (1 - damping_factor) / n)
+        change = numpy.abs(new - ranks).sum()
+        ranks = new
+        if trace is not None:
+            trace.record(change)
+        if change <= tolerance:
+            break
+    return ranks, iteration
+
+
+def teleport_matrix(pages, teleports):
+    """
+    Return a dense matrix with one normalized teleport distribution per
+    column, from a list of dictionaries mapping pages to weights.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    matrix = numpy.zeros((len(pages), len(teleports)))
+    for k, teleport in enumerate(teleports):
+        for page, weight in teleport.items():
+            matrix[index[page], k] = weight
+        total = matrix[:, k].sum()
+        if total <= 0:
+            raise ValueError(f"teleport distribution {k} has no weight")
+        matrix[:, k] /= total
+    return matrix
+
+
+def personalized_pagerank(corpus, damping_factor, teleports,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                          trace=None):
+    """
+    Return personalized PageRank values for each of `teleports`, a list of
+    dictionaries giving the weight of each page for random jumps (pages left
+    out get none). Jumps from pages with no links also follow the teleport.
+
+    All distributions are solved together as the columns of one dense
+    matrix, so the links are traversed once per iteration for every user.
+    Return a list with one PageRank dictionary per teleport distribution.
+    """
+    pages, src, dst, outdegree = link_arrays(corpus)
+    n = len(pages)
+    spread = transition_operator(src, dst, outdegree, n)
+    sinks = outdegree == 0
+    teleport = teleport_matrix(pages, teleports)
 
+    ranks = teleport.copy()
+    for iteration in range(max_iterations):
+        # Mass that jumps: 1-d from every page plus d from sinks, per column
+        jump = (1 - damping_factor) + damping_factor * ranks[sinks].sum(axis=0)
+        new = damping_factor * spread(ranks) + teleport * jump
+        change = numpy.abs(new - ranks).sum(axis=0).max()
+        ranks = new
+        if trace is not None:
+            trace.record(change)
+        if change <= tolerance:
+            break
+    return [dict(zip(pages, column.tolist())) for column in ranks.T]
 
 if __name__ == "__main__":
     main()